@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Fetch card art once, cache it locally and serve our own thumbnails.
+
+Runs as the `assets` stage of pipeline.py, between clean and ingest, so the
+rewritten `img_url` is what ingest loads into `info`:
+1. Fetch every `img_url` with a conditional GET (ETag / Last-Modified from the
+   previous run), so unchanged sources cost a 304 and nothing else.
+2. Store originals by content hash, so cards sharing artwork share one file.
+3. Render resized WebP (and AVIF, when Pillow supports it) thumbnails in a
+   process pool; existing thumbnails are never re-rendered.
+4. Write a copy of the info CSV with `img_url` pointing at our cached thumbnail
+   (cards whose art could not be fetched keep the bank's URL). Without an
+   absolute `--public-base-url` / `CARD_ART_BASE_URL` every card keeps the
+   bank's URL: the client runs on another origin and uses `img_url` as-is.
+
+Cache layout (in --cache-dir, default `script/assets/`):
+- originals/<sha256>.<ext>
+- thumbs/<sha256>_<width>.webp|.avif
+- cache.json   source url -> {etag, last_modified, sha256}
+
+Serving: thumbnail names are content hashes, so they can be cached forever.
+The API serves `thumbs/` under `/card-art/thumbs` when `CARD_ART_DIR` points
+at the cache directory (server/src/app.js); use e.g.
+`CARD_ART_BASE_URL=http://localhost:3000/card-art` locally, or the deployed API
+host or a CDN in front of `thumbs/` in production.
+
+`--stub-dir` serves a local folder of sample images and fetches every card's
+image from it by file name instead of hitting the banks, for testing.
+
+Usage examples:
+    python script/card_art_assets.py --public-base-url http://localhost:3000/card-art
+    python script/card_art_assets.py --stub-dir ./sample_images --cache-dir /tmp/assets
+"""
+import argparse
+import csv
+import functools
+import hashlib
+import http.server
+import json
+import mimetypes
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlparse
+
+import requests
+
+THUMB_WIDTHS = (250, 125)
+THUMB_FORMATS = {'webp': 'WEBP', 'avif': 'AVIF'}
+THUMB_QUALITY = 80
+CACHE_MANIFEST = 'cache.json'
+FETCH_TIMEOUT = 15
+
+
+def load_cache(cache_dir):
+    path = Path(cache_dir) / CACHE_MANIFEST
+    if not path.is_file():
+        return {}
+    try:
+        with open(path, encoding='utf-8') as fh:
+            return json.load(fh)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Warning: ignoring unreadable cache manifest {path}: {e}")
+        return {}
+
+
+def save_cache(cache_dir, cache):
+    path = Path(cache_dir) / CACHE_MANIFEST
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as fh:
+        json.dump(cache, fh, indent=2, sort_keys=True)
+    tmp_path.replace(path)
+
+
+def fetch_original(session, url, cached, originals_dir):
+    """Fetch `url` unless the cached copy is still current.
+
+    Returns the cache entry {etag, last_modified, sha256, ext}; on failure the
+    previous entry (or None) is returned unchanged.
+    """
+    headers = {}
+    if cached and (originals_dir / f"{cached['sha256']}{cached['ext']}").is_file():
+        if cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+        if cached.get('last_modified'):
+            headers['If-Modified-Since'] = cached['last_modified']
+    try:
+        resp = session.get(url, headers=headers, timeout=FETCH_TIMEOUT)
+        if resp.status_code == 304:
+            return cached
+        resp.raise_for_status()
+    except requests.RequestException as e:
+        print(f"Error fetching {url}: {e}")
+        return cached
+
+    content_type = resp.headers.get('Content-Type', '').split(';')[0].strip()
+    ext = Path(urlparse(url).path).suffix.lower() or mimetypes.guess_extension(content_type) or '.img'
+    sha = hashlib.sha256(resp.content).hexdigest()
+    path = originals_dir / f"{sha}{ext}"
+    if not path.is_file():
+        path.write_bytes(resp.content)
+    return {
+        'etag': resp.headers.get('ETag'),
+        'last_modified': resp.headers.get('Last-Modified'),
+        'sha256': sha,
+        'ext': ext,
+    }
+
+
+def available_formats():
+    from PIL import features
+    return [fmt for fmt in THUMB_FORMATS if features.check(fmt)]
+
+
+def render_thumbnails(original_path, thumbs_dir, sha, formats):
+    """Render missing thumbnails for one original. Runs in a worker process."""
+    from PIL import Image
+
+    rendered = 0
+    image = None
+    for width in THUMB_WIDTHS:
+        for fmt in formats:
+            out_path = Path(thumbs_dir) / f"{sha}_{width}.{fmt}"
+            if out_path.is_file():
+                continue
+            if image is None:
+                image = Image.open(original_path)
+                image.load()
+                if image.mode not in ('RGB', 'RGBA'):
+                    image = image.convert('RGBA')
+            thumb = image.copy()
+            thumb.thumbnail((width, width * 4), Image.LANCZOS)
+            tmp_path = out_path.with_name(out_path.name + '.tmp')
+            thumb.save(tmp_path, THUMB_FORMATS[fmt], quality=THUMB_QUALITY)
+            tmp_path.replace(out_path)
+            rendered += 1
+    return rendered
+
+
+class _QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def start_stub_server(directory):
+    """Serve `directory` over HTTP on a free local port. Returns (server, base_url)."""
+    handler = functools.partial(_QuietHandler, directory=str(directory))
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def is_absolute_url(url):
+    parsed = urlparse(url or '')
+    return parsed.scheme in ('http', 'https') and bool(parsed.netloc)
+
+
+def process_assets(info_path, output_path, cache_dir, public_base_url, workers=4, stub_base_url=None):
+    """Fetch, dedupe and thumbnail all card art, then write the rewritten info CSV.
+
+    `img_url` is only rewritten when `public_base_url` is absolute.
+
+    Returns (cards, unique_images, thumbnails_rendered).
+    """
+    cache_dir = Path(cache_dir)
+    originals_dir = cache_dir / 'originals'
+    thumbs_dir = cache_dir / 'thumbs'
+    originals_dir.mkdir(parents=True, exist_ok=True)
+    thumbs_dir.mkdir(parents=True, exist_ok=True)
+
+    with open(info_path, newline='', encoding='utf-8') as fh:
+        reader = csv.DictReader(fh)
+        fieldnames = reader.fieldnames
+        rows = list(reader)
+
+    def fetch_url(url):
+        if stub_base_url:
+            return f"{stub_base_url}/{Path(urlparse(url).path).name}"
+        return url
+
+    urls = sorted({(r.get('img_url') or '').strip() for r in rows} - {'', 'N/A'})
+    cache = load_cache(cache_dir)
+    with requests.Session() as session, ThreadPoolExecutor(max_workers=8) as pool:
+        entries = pool.map(lambda u: fetch_original(session, fetch_url(u), cache.get(u), originals_dir), urls)
+        for url, entry in zip(urls, entries):
+            if entry:
+                cache[url] = entry
+    save_cache(cache_dir, cache)
+
+    formats = available_formats()
+    if not formats:
+        print('Warning: Pillow has no WebP/AVIF support; no thumbnails rendered')
+    unique = {e['sha256']: originals_dir / f"{e['sha256']}{e['ext']}" for u, e in cache.items() if u in urls}
+    rendered = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(render_thumbnails, str(p), str(thumbs_dir), sha, formats) for sha, p in unique.items()]
+        for f in futures:
+            try:
+                rendered += f.result()
+            except Exception as e:
+                print(f"Error rendering thumbnail: {e}")
+
+    # prefer the first available format (WebP) at full width for img_url
+    preferred = f"{THUMB_WIDTHS[0]}.{formats[0]}" if formats else None
+    if not is_absolute_url(public_base_url):
+        print('Warning: no absolute public base URL (CARD_ART_BASE_URL); keeping the banks\' img_url')
+        preferred = None
+    for row in rows:
+        entry = cache.get((row.get('img_url') or '').strip())
+        if entry and preferred and (thumbs_dir / f"{entry['sha256']}_{preferred}").is_file():
+            row['img_url'] = f"{public_base_url.rstrip('/')}/thumbs/{entry['sha256']}_{preferred}"
+
+    with open(output_path, 'w', newline='', encoding='utf-8') as fh:
+        writer = csv.DictWriter(fh, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+    return len(rows), len(unique), rendered
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cache card art and rewrite img_url to local thumbnails')
+
+    repo_root = Path(__file__).resolve().parent.parent
+    default_info = repo_root / 'script' / 'processed' / 'info_output_cleaned.csv'
+    default_output = repo_root / 'script' / 'processed' / 'info_output_assets.csv'
+    default_cache = repo_root / 'script' / 'assets'
+
+    parser.add_argument('--info', default=str(default_info), help='Path to info CSV')
+    parser.add_argument('--output', default=str(default_output), help='Where to write the info CSV with rewritten img_url')
+    parser.add_argument('--cache-dir', default=str(default_cache), help='Asset cache directory')
+    parser.add_argument('--public-base-url', default=os.getenv('CARD_ART_BASE_URL'),
+                        help='Absolute URL the cache directory is served under (img_url is left alone without it)')
+    parser.add_argument('--workers', type=int, default=4, help='Processes for thumbnail rendering')
+    parser.add_argument('--stub-dir', help='Serve sample images from this directory instead of fetching from the banks')
+    args = parser.parse_args()
+
+    if not Path(args.info).is_file():
+        print(f"Info CSV not found: {args.info}")
+        sys.exit(2)
+
+    server = None
+    stub_base_url = None
+    if args.stub_dir:
+        server, stub_base_url = start_stub_server(args.stub_dir)
+        print(f"Serving stub images from {args.stub_dir} at {stub_base_url}")
+    try:
+        cards, unique, rendered = process_assets(
+            args.info, args.output, args.cache_dir, args.public_base_url, args.workers, stub_base_url,
+        )
+    finally:
+        if server:
+            server.shutdown()
+
+    print(f"✓ {cards} cards, {unique} unique images, {rendered} thumbnails rendered")
+    print(f"  Output written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
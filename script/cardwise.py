@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Single entry point for the CardWise data pipeline.
+
+Subcommands:
+    scrape     run bank scrapers (all, or --bank boa chase discover)  -> raw/*.json
+    transform  LLM transform of raw JSON (start.py)                   -> processed/{info,reward}_output.csv
+    clean      strip escape debris from the info CSV (clean.py)       -> processed/info_output_cleaned.csv
+    equiv      compute cashback equivalents (compute_cashback_equiv)  -> processed/reward_output_cashback_equiv_processed.csv
+    assets     cache card art and point img_url at our thumbnails     -> processed/info_output_assets.csv
+    ingest     upsert into MongoDB (insert_csv_to_mongo.py)
+    all        the stage graph in pipeline.py: independent stages in parallel,
+               up-to-date stages skipped, resumes after a failure
+
+`--dry-run` works before or after the subcommand. Options for
+insert_csv_to_mongo.py go after `--` (ingest and all only); anything else
+argparse doesn't know is an error.
+
+Only the standard library is imported at startup. openai, selenium, pymongo
+and friends are imported inside the stage that needs them, so `--dry-run` or a
+single-bank scrape doesn't pay for the rest. Startup time is printed to stderr.
+
+Stages run with `script/` as the working directory, so the relative paths the
+individual scripts use work no matter where this is launched from.
+
+Usage examples:
+    python script/cardwise.py scrape --bank chase
+    python script/cardwise.py ingest -- --snapshot-dir ./snapshot
+    python script/cardwise.py all --dry-run
+"""
+import time
+
+_STARTED = time.perf_counter()
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+BANKS = ['boa', 'chase', 'discover']
+
+
+def run_scrape(args):
+    import pipeline
+    for bank in args.bank:
+        print(f"Scraping {bank}...")
+        pipeline.scrape_bank(bank)
+
+
+def run_transform(args):
+    import pipeline
+    pipeline.transform()
+
+
+def run_clean(args):
+    import pipeline
+    pipeline.clean()
+
+
+def run_equiv(args):
+    import pipeline
+    pipeline.equiv()
+
+
+def run_assets(args):
+    import pipeline
+    pipeline.assets()
+
+
+def run_ingest(args):
+    import pipeline
+    pipeline.ingest(args.ingest_args)
+
+
+def run_all(args):
+    import pipeline
+    try:
+        ok = pipeline.run_pipeline(force=args.force, from_stage=args.from_stage, jobs=args.jobs,
+                                   dry_run=args.dry_run, ingest_args=args.ingest_args)
+    except ValueError as e:
+        print(e)
+        sys.exit(2)
+    if not ok:
+        sys.exit(1)
+
+
+STAGES = {
+    'scrape': (run_scrape, 'Scrape bank card listings into raw/*.json'),
+    'transform': (run_transform, 'Transform raw JSON into info/reward CSVs with the LLM'),
+    'clean': (run_clean, 'Clean the info CSV'),
+    'equiv': (run_equiv, 'Compute cashback equivalent percentages'),
+    'assets': (run_assets, 'Cache card art and rewrite img_url to our thumbnails'),
+    'ingest': (run_ingest, 'Upsert the info/reward CSVs into MongoDB'),
+    'all': (run_all, 'Run the stage graph, skipping up-to-date stages (pipeline.py)'),
+}
+
+
+def run_stage(name, args):
+    func, description = STAGES[name]
+    if args.dry_run and name != 'all':
+        detail = f" ({', '.join(args.bank)})" if name == 'scrape' else ''
+        print(f"[dry-run] {name}: {description}{detail}")
+        return
+    started = time.perf_counter()
+    func(args)
+    print(f"cardwise: {name} finished in {time.perf_counter() - started:.2f}s", file=sys.stderr)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='cardwise', description='CardWise data pipeline')
+    parser.add_argument('--dry-run', action='store_true', help='Print the stages that would run without running them')
+    sub = parser.add_subparsers(dest='command', required=True)
+    for name, (_, description) in STAGES.items():
+        stage_parser = sub.add_parser(name, help=description, description=description)
+        # SUPPRESS keeps an absent subcommand flag from resetting a top-level --dry-run
+        stage_parser.add_argument('--dry-run', action='store_true', default=argparse.SUPPRESS,
+                                  help='Print the stages that would run without running them')
+        if name == 'scrape':
+            stage_parser.add_argument('--bank', nargs='+', choices=BANKS, default=BANKS, help='Banks to scrape')
+        if name == 'all':
+            stage_parser.add_argument('--force', action='store_true', help='Rerun every stage')
+            stage_parser.add_argument('--from', dest='from_stage', help='Force this stage and everything downstream of it')
+            stage_parser.add_argument('--jobs', type=int, default=4, help='Stages to run in parallel')
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    argv = sys.argv[1:] if argv is None else list(argv)
+    # everything after `--` is handed to insert_csv_to_mongo.py by ingest/all
+    ingest_args = []
+    if '--' in argv:
+        split = argv.index('--')
+        argv, ingest_args = argv[:split], argv[split + 1:]
+    args = parser.parse_args(argv)
+    if ingest_args and args.command not in ('ingest', 'all'):
+        parser.error(f"options after -- are only accepted by ingest and all: {' '.join(ingest_args)}")
+    args.ingest_args = ingest_args
+    print(f"cardwise: ready in {(time.perf_counter() - _STARTED) * 1000:.0f} ms", file=sys.stderr)
+
+    # the individual scripts resolve ./raw, ./processed and ./prompt against the cwd
+    os.chdir(SCRIPT_DIR)
+    if str(SCRIPT_DIR) not in sys.path:
+        sys.path.insert(0, str(SCRIPT_DIR))
+    run_stage(args.command, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -4,15 +4,21 @@ import re
 input_path = r"./processed/info_output.csv"
 output_path = r"./processed/info_output_cleaned.csv"
 
-# Read the content of the CSV file
-with open(input_path, "r", encoding="utf-8") as f:
-    content = f.read()
 
-# Remove all occurrences of "\x"
-clean_content = re.sub(r'\\x', '', content)
+def clean_info(input_path=input_path, output_path=output_path):
+    # Read the content of the CSV file
+    with open(input_path, "r", encoding="utf-8") as f:
+        content = f.read()
 
-# Write the cleaned content to a new file
-with open(output_path, "w", encoding="utf-8") as f:
-    f.write(clean_content)
+    # Remove all occurrences of "\x"
+    clean_content = re.sub(r'\\x', '', content)
 
-print(f"Cleaned CSV written to {output_path}")
\ No newline at end of file
+    # Write the cleaned content to a new file
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write(clean_content)
+
+    print(f"Cleaned CSV written to {output_path}")
+
+
+if __name__ == "__main__":
+    clean_info()
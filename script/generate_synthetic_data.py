@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+Generate a seeded, deterministic synthetic dataset at arbitrary scale.
+
+Tables (same seed + same sizes = byte-identical output):
+- info:     _id,card_id,card_name,card_type,bank_id,img_url,annual_fee
+            (the schema insert_csv_to_mongo.py reads, plus the card's `_id`)
+- reward:   card_id,category,cashback_pct,point_mul,cashback_equiv_pct
+- users:    User documents (email, profile.{firstName,lastName}, ownedCards, timestamps)
+- spending: Spending documents (userId, amount, category, date, merchant, cardId, cardUsed,
+            createdAt/updatedAt = date, so spending_rollups.py picks them up)
+
+Everything is streamed, so memory stays flat for millions of transactions.
+
+Cards get deterministic `_id`s so Spending.cardId resolves to the Card. Both
+targets write the same documents.
+
+Targets:
+- files (default): info/reward as CSV, users/spending as JSONL in MongoDB
+  Extended JSON or as CSV (`--format csv`, ids as hex strings, nested fields
+  as dotted columns). The JSONL format also writes info.jsonl and
+  reward.jsonl; import those instead of loading the CSVs through
+  insert_csv_to_mongo.py, which would assign new `_id`s and leave
+  Spending.cardId dangling:
+      mongoimport --db cardwise --collection info --file info.jsonl
+      mongoimport --db cardwise --collection reward --file reward.jsonl
+      mongoimport --db cardwise --collection users --file users.jsonl
+      mongoimport --db cardwise --collection spendings --file spending.jsonl
+- mongo: bulk-load all four collections straight into a local MongoDB.
+
+Usage examples:
+    python script/generate_synthetic_data.py --cards 20000 --users 50000 --txns-per-user 40
+    python script/generate_synthetic_data.py --target mongo --db cardwise_synthetic --users 10000
+"""
+import os
+import argparse
+import csv
+import hashlib
+import json
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from compute_cashback_equiv import BANK_CONVERSION_FACTORS, compute_cashback_equiv
+
+REWARD_CATEGORIES = ['dining', 'grocery', 'gas', 'travel', 'online', 'pharma']
+# relative share of transactions per category; "other" spend earns the "all" rate
+SPENDING_WEIGHTS = {'dining': 25, 'grocery': 25, 'gas': 12, 'travel': 8, 'online': 15, 'pharma': 5, 'other': 10}
+SPENDING_MEDIANS = {'dining': 35, 'grocery': 70, 'gas': 45, 'travel': 280, 'online': 55, 'pharma': 25, 'other': 40}
+ANNUAL_FEES = [0, 0, 0, 0, 39, 95, 99, 250, 395, 550, 695]
+NAME_WORDS = ['Cash', 'Rewards', 'Travel', 'Premier', 'Select', 'Everyday', 'Platinum',
+              'Sapphire', 'Freedom', 'Unlimited', 'Plus', 'Student', 'Secured', 'Flex', 'Elite']
+MERCHANTS = {
+    'dining': ['Corner Bistro', 'Taco Stand', 'Noodle House', 'Cafe Luna'],
+    'grocery': ['FreshMart', 'Green Grocer', 'Daily Foods'],
+    'gas': ['FuelStop', 'QuickGas', 'Highway Fuel'],
+    'travel': ['SkyAir', 'Metro Transit', 'Harbor Hotel', 'RideNow'],
+    'online': ['ShopOnline', 'eBuy', 'Marketplace'],
+    'pharma': ['CityPharmacy', 'HealthPlus'],
+    'other': ['Hardware Co', 'Bookstore', 'Cinema 8'],
+}
+INFO_FIELDS = ['_id', 'card_id', 'card_name', 'card_type', 'bank_id', 'img_url', 'annual_fee']
+REWARD_FIELDS = ['card_id', 'category', 'cashback_pct', 'point_mul', 'cashback_equiv_pct']
+USER_FIELDS = ['_id', 'email', 'profile.firstName', 'profile.lastName', 'ownedCards', 'createdAt', 'updatedAt']
+SPENDING_FIELDS = ['userId', 'amount', 'category', 'date', 'merchant', 'cardId', 'cardUsed', 'createdAt', 'updatedAt']
+BASE_DATE = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def object_id_hex(kind, index, seed):
+    """Deterministic 24-hex-char ObjectId for entity `index` of `kind`."""
+    return hashlib.blake2b(f"{seed}:{kind}:{index}".encode(), digest_size=12).hexdigest()
+
+
+def bank_ids(n_banks):
+    banks = list(BANK_CONVERSION_FACTORS)
+    return banks + [f"synthetic_bank_{i:03d}" for i in range(max(n_banks - len(banks), 0))]
+
+
+def generate_cards(n_cards, n_banks, seed):
+    """Yield (info_row, [reward_rows]) per card."""
+    rng = random.Random(f"{seed}:cards")
+    banks = bank_ids(n_banks)
+    for i in range(n_cards):
+        bank_id = banks[i % len(banks)]
+        words = rng.sample(NAME_WORDS, 2)
+        card_id = f"{bank_id}_{words[0].lower()}_{words[1].lower()}_{i:06d}"
+        card_type = 'point' if rng.random() < 0.4 else 'cashback'
+        info = {
+            'card_id': card_id,
+            'card_name': f"{bank_id.replace('_', ' ').title()} {words[0]} {words[1]} {i}",
+            'card_type': card_type,
+            'bank_id': bank_id,
+            'img_url': f"https://example.com/cards/{card_id}.png",
+            'annual_fee': rng.choice(ANNUAL_FEES),
+        }
+
+        rewards = []
+        bonus = rng.sample(REWARD_CATEGORIES, rng.randint(0, 4))
+        for category in ['all'] + bonus:
+            rate = rng.choice([1, 1, 2]) if category == 'all' else rng.randint(2, 6)
+            cashback_pct, point_mul = (0, rate) if card_type == 'point' else (rate, 0)
+            rewards.append({
+                'card_id': card_id,
+                'category': category,
+                'cashback_pct': cashback_pct,
+                'point_mul': point_mul,
+                'cashback_equiv_pct': compute_cashback_equiv(cashback_pct, point_mul, bank_id),
+            })
+        yield info, rewards
+
+
+def generate_users(n_users, card_ids, seed):
+    rng = random.Random(f"{seed}:users")
+    for i in range(n_users):
+        owned = rng.sample(card_ids, min(rng.randint(1, 5), len(card_ids)))
+        created = BASE_DATE - timedelta(days=rng.randint(1, 365))
+        yield {
+            '_id': object_id_hex('user', i, seed),
+            'email': f"synthetic{i}@example.com",
+            'profile': {'firstName': 'Synthetic', 'lastName': f"User{i}"},
+            'ownedCards': owned,
+            'createdAt': created,
+            'updatedAt': created,
+        }
+
+
+def generate_spending(user, txns, months, card_oids, seed, user_index):
+    # per-user stream so any user's history can be regenerated on its own
+    rng = random.Random(f"{seed}:spending:{user_index}")
+    categories = list(SPENDING_WEIGHTS)
+    weights = list(SPENDING_WEIGHTS.values())
+    span_seconds = months * 30 * 86400
+    for category in rng.choices(categories, weights, k=txns):
+        card_id = rng.choice(user['ownedCards']) if user['ownedCards'] else None
+        date = BASE_DATE + timedelta(seconds=rng.randrange(span_seconds))
+        yield {
+            'userId': user['_id'],
+            'amount': round(SPENDING_MEDIANS[category] * rng.lognormvariate(0, 0.6), 2),
+            'category': category,
+            'date': date,
+            'merchant': rng.choice(MERCHANTS[category]),
+            'cardId': card_oids.get(card_id),
+            'cardUsed': card_id,
+            # timestamps as if each entry was logged when it happened
+            'createdAt': date,
+            'updatedAt': date,
+        }
+
+
+def to_extended_json(doc, oid_fields):
+    """Render ObjectId/date fields as MongoDB Extended JSON for mongoimport."""
+    out = {}
+    for k, v in doc.items():
+        if k in oid_fields and v is not None:
+            out[k] = {'$oid': v}
+        elif isinstance(v, datetime):
+            out[k] = {'$date': v.isoformat().replace('+00:00', 'Z')}
+        else:
+            out[k] = v
+    return out
+
+
+def to_csv_row(doc, prefix=''):
+    """Flatten a document for CSV: nested fields as dotted columns, lists ';'-joined."""
+    row = {}
+    for k, v in doc.items():
+        if isinstance(v, dict):
+            row.update(to_csv_row(v, f"{prefix}{k}."))
+        elif isinstance(v, list):
+            row[prefix + k] = ';'.join(v)
+        elif isinstance(v, datetime):
+            row[prefix + k] = v.isoformat()
+        else:
+            row[prefix + k] = v
+    return row
+
+
+def to_mongo(doc, oid_fields):
+    from bson import ObjectId
+    return {k: ObjectId(v) if k in oid_fields and v is not None else v for k, v in doc.items()}
+
+
+def _tee(*writers):
+    def write(doc):
+        for writer in writers:
+            writer(doc)
+    return write
+
+
+class FileSink:
+    """Writes info/reward as CSV (plus JSONL) and users/spending as JSONL or CSV."""
+
+    def __init__(self, out_dir, fmt):
+        self.out_dir = Path(out_dir)
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self.fmt = fmt
+        self._files = []
+
+    def _csv(self, name, fields):
+        fh = open(self.out_dir / f"{name}.csv", 'w', newline='', encoding='utf-8')
+        self._files.append(fh)
+        writer = csv.DictWriter(fh, fieldnames=fields, extrasaction='ignore')
+        writer.writeheader()
+        return lambda doc: writer.writerow(to_csv_row(doc))
+
+    def _jsonl(self, name, oid_fields):
+        fh = open(self.out_dir / f"{name}.jsonl", 'w', encoding='utf-8')
+        self._files.append(fh)
+        return lambda doc: fh.write(json.dumps(to_extended_json(doc, oid_fields)) + '\n')
+
+    def writers(self):
+        info = self._csv('info', INFO_FIELDS)
+        reward = self._csv('reward', REWARD_FIELDS)
+        if self.fmt == 'csv':
+            users = self._csv('users', USER_FIELDS)
+            spending = self._csv('spending', SPENDING_FIELDS)
+        else:
+            # the CSVs feed insert_csv_to_mongo.py; the JSONL keeps ObjectIds and timestamps for mongoimport
+            info = _tee(info, self._jsonl('info', {'_id'}))
+            reward = _tee(reward, self._jsonl('reward', set()))
+            users = self._jsonl('users', {'_id'})
+            spending = self._jsonl('spending', {'userId', 'cardId'})
+        return info, reward, users, spending
+
+    def close(self):
+        for fh in self._files:
+            fh.close()
+
+
+class MongoSink:
+    """Buffers documents and bulk-inserts them in batches."""
+
+    def __init__(self, db, batch_size):
+        self.db = db
+        self.batch_size = batch_size
+        self._buffers = {}
+
+    def _writer(self, coll_name, transform):
+        buffer = self._buffers.setdefault(coll_name, [])
+
+        def write(doc):
+            buffer.append(transform(doc))
+            if len(buffer) >= self.batch_size:
+                self._flush(coll_name)
+        return write
+
+    def _flush(self, coll_name):
+        buffer = self._buffers[coll_name]
+        if buffer:
+            self.db[coll_name].insert_many(buffer, ordered=False)
+            buffer.clear()
+
+    def writers(self):
+        info = self._writer('info', lambda d: to_mongo(d, {'_id'}))
+        reward = self._writer('reward', lambda d: d)
+        users = self._writer('users', lambda u: to_mongo(u, {'_id'}))
+        spending = self._writer('spendings', lambda s: to_mongo(s, {'userId', 'cardId'}))
+        return info, reward, users, spending
+
+    def close(self):
+        for coll_name in self._buffers:
+            self._flush(coll_name)
+
+
+def generate(sink, args):
+    """Stream every table into `sink`. Returns row counts per table."""
+    write_info, write_reward, write_user, write_spending = sink.writers()
+    counts = {'info': 0, 'reward': 0, 'users': 0, 'spending': 0}
+
+    # card ids are the only state kept in memory: users need them to pick ownedCards
+    card_ids = []
+    card_oids = {}
+    for i, (info, rewards) in enumerate(generate_cards(args.cards, args.banks, args.seed)):
+        card_oids[info['card_id']] = object_id_hex('card', i, args.seed)
+        card_ids.append(info['card_id'])
+        write_info({'_id': card_oids[info['card_id']], **info, 'createdAt': BASE_DATE, 'updatedAt': BASE_DATE})
+        counts['info'] += 1
+        for r in rewards:
+            write_reward({**r, 'createdAt': BASE_DATE, 'updatedAt': BASE_DATE})
+            counts['reward'] += 1
+
+    for i, user in enumerate(generate_users(args.users, card_ids, args.seed)):
+        write_user(user)
+        counts['users'] += 1
+        for txn in generate_spending(user, args.txns_per_user, args.months, card_oids, args.seed, i):
+            write_spending(txn)
+            counts['spending'] += 1
+        if args.users >= 10 and (i + 1) % (args.users // 10) == 0:
+            print(f"  {i + 1}/{args.users} users, {counts['spending']} transactions")
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a deterministic synthetic CardWise dataset')
+
+    repo_root = Path(__file__).resolve().parent.parent
+    default_out = repo_root / 'script' / 'synthetic'
+
+    parser.add_argument('--cards', type=int, default=1000, help='Number of cards')
+    parser.add_argument('--banks', type=int, default=20, help='Number of banks (the 3 real ones included)')
+    parser.add_argument('--users', type=int, default=1000, help='Number of users')
+    parser.add_argument('--txns-per-user', type=int, default=100, help='Spending entries per user')
+    parser.add_argument('--months', type=int, default=12, help='Months of history to spread spending over')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed')
+    parser.add_argument('--target', choices=['files', 'mongo'], default='files', help='Write files or bulk-load MongoDB')
+    parser.add_argument('--format', choices=['jsonl', 'csv'], default='jsonl', help='File format for users and spending')
+    parser.add_argument('--out-dir', default=str(default_out), help='Output directory for --target files')
+    parser.add_argument('--mongo-uri', default=os.getenv('MONGODB_URI', 'mongodb://localhost:27017'), help='MongoDB URI')
+    parser.add_argument('--db', default=os.getenv('MONGODB_DB', 'cardwise_synthetic'), help='Database name for --target mongo')
+    parser.add_argument('--batch-size', type=int, default=10000, help='Documents per insert_many for --target mongo')
+    args = parser.parse_args()
+
+    if args.cards < 1:
+        print('--cards must be at least 1')
+        sys.exit(2)
+
+    if args.target == 'mongo':
+        from pymongo import MongoClient
+        print(f"Connecting to MongoDB at {args.mongo_uri}, db={args.db}")
+        try:
+            client = MongoClient(args.mongo_uri, serverSelectionTimeoutMS=5000)
+            client.admin.command('ping')
+        except Exception as e:
+            print(f"Failed to connect to MongoDB: {e}")
+            sys.exit(1)
+        sink = MongoSink(client[args.db], args.batch_size)
+    else:
+        sink = FileSink(args.out_dir, args.format)
+
+    started = time.perf_counter()
+    try:
+        counts = generate(sink, args)
+    finally:
+        sink.close()
+    elapsed = time.perf_counter() - started
+
+    destination = f"{args.db}" if args.target == 'mongo' else args.out_dir
+    print(f"✓ Generated {counts['info']} cards, {counts['reward']} rewards, {counts['users']} users, "
+          f"{counts['spending']} transactions into {destination} in {elapsed:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
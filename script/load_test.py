@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Asyncio load generator for the recommendation and spending APIs.
+
+Registers a pool of throwaway users (the same /api/users/register flow as
+server/test_auth.js), gives each a few owned cards and spending entries, then
+ramps concurrency through the given stages while virtual users loop over a
+weighted request mix:
+
+- global:   GET /api/recommendations/global?category=<random category>
+- my-cards: GET /api/recommendations/my-cards
+- spending: GET /api/spending
+
+For each stage it reports throughput plus p50/p95/p99 latency per endpoint, and
+flags the first stage where throughput stops growing or errors appear (the
+saturation point). Results are saved as JSON so runs can be compared with
+`--compare`.
+
+Run it against a local server and a local mongod only: it creates users and
+spending in whatever database the server is pointed at.
+
+Usage examples:
+    python script/load_test.py
+    python script/load_test.py --stages 10,50,100,200 --stage-duration 20 --mix global=5,my-cards=3,spending=2
+    python script/load_test.py --compare ./script/loadtest_results/20250101T120000.json
+"""
+import argparse
+import asyncio
+import csv
+import json
+import math
+import random
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import aiohttp
+
+CATEGORIES = ['all', 'dining', 'grocery', 'travel', 'gas', 'online']
+ENDPOINTS = {
+    'global': lambda: f"/api/recommendations/global?category={random.choice(CATEGORIES)}",
+    'my-cards': lambda: '/api/recommendations/my-cards',
+    'spending': lambda: '/api/spending',
+}
+# a stage is saturated when throughput grows less than this over the previous stage
+SATURATION_GAIN = 1.05
+SATURATION_ERROR_RATE = 0.01
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint '{name}' (choose from {', '.join(ENDPOINTS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    k = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+
+def load_card_ids(info_path):
+    try:
+        with open(info_path, newline='', encoding='utf-8') as fh:
+            return [row['card_id'].strip() for row in csv.DictReader(fh) if (row.get('card_id') or '').strip()]
+    except OSError:
+        return []
+
+
+async def create_user(session, base_url, run_id, index, card_ids, spending_per_user):
+    """Register one user and seed owned cards and spending. Returns the JWT token."""
+    async with session.post(f"{base_url}/api/users/register", json={
+        'email': f"loadtest+{run_id}_{index}@example.com",
+        'password': 'loadtestpassword123',
+        'firstName': 'Load',
+        'lastName': f"Tester{index}",
+    }) as resp:
+        data = await resp.json()
+    if not data.get('success') or not data.get('token'):
+        raise RuntimeError(f"Registration failed: {data.get('message')}")
+
+    token = data['token']
+    headers = {'Authorization': f"Bearer {token}"}
+    if card_ids:
+        owned = random.sample(card_ids, min(3, len(card_ids)))
+        async with session.patch(f"{base_url}/api/users/{data['data']['id']}/owned-cards",
+                                 json={'cardIds': owned}, headers=headers) as resp:
+            await resp.read()
+    for _ in range(spending_per_user):
+        async with session.post(f"{base_url}/api/spending", headers=headers, json={
+            'amount': round(random.uniform(5, 250), 2),
+            'category': random.choice(CATEGORIES[1:]),
+            'merchant': 'Load Test',
+        }) as resp:
+            await resp.read()
+    return token
+
+
+async def virtual_user(session, base_url, token, mix, deadline, samples):
+    names = list(mix)
+    weights = list(mix.values())
+    headers = {'Authorization': f"Bearer {token}"}
+    while time.perf_counter() < deadline:
+        name = random.choices(names, weights)[0]
+        started = time.perf_counter()
+        try:
+            async with session.get(base_url + ENDPOINTS[name](), headers=headers) as resp:
+                await resp.read()
+                ok = resp.status < 400
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            ok = False
+        samples.append((name, time.perf_counter() - started, ok))
+
+
+def summarize_stage(concurrency, duration, samples):
+    by_endpoint = {}
+    for name, latency, ok in samples:
+        entry = by_endpoint.setdefault(name, {'latencies': [], 'errors': 0})
+        entry['latencies'].append(latency)
+        entry['errors'] += not ok
+
+    endpoints = {}
+    for name, entry in sorted(by_endpoint.items()):
+        lat = sorted(entry['latencies'])
+        endpoints[name] = {
+            'requests': len(lat),
+            'errors': entry['errors'],
+            'rps': round(len(lat) / duration, 2),
+            'p50_ms': round(percentile(lat, 50) * 1000, 2),
+            'p95_ms': round(percentile(lat, 95) * 1000, 2),
+            'p99_ms': round(percentile(lat, 99) * 1000, 2),
+        }
+    total = len(samples)
+    errors = sum(not ok for _, _, ok in samples)
+    return {
+        'concurrency': concurrency,
+        'duration_s': round(duration, 2),
+        'requests': total,
+        'errors': errors,
+        'rps': round(total / duration, 2) if duration else 0,
+        'endpoints': endpoints,
+    }
+
+
+def find_saturation(stages):
+    """Concurrency of the first stage where throughput plateaus or errors appear."""
+    for prev, stage in zip([None] + stages, stages):
+        error_rate = stage['errors'] / stage['requests'] if stage['requests'] else 1
+        if error_rate > SATURATION_ERROR_RATE:
+            return stage['concurrency']
+        if prev and stage['rps'] < prev['rps'] * SATURATION_GAIN:
+            return stage['concurrency']
+    return None
+
+
+def print_stage(stage):
+    print(f"\nConcurrency {stage['concurrency']}: {stage['requests']} requests, "
+          f"{stage['rps']} req/s, {stage['errors']} errors")
+    for name, e in stage['endpoints'].items():
+        print(f"  {name:<9} {e['rps']:>8} req/s  p50={e['p50_ms']:>8}ms  "
+              f"p95={e['p95_ms']:>8}ms  p99={e['p99_ms']:>8}ms  errors={e['errors']}")
+
+
+def print_comparison(previous, current):
+    print(f"\nCompared with {previous.get('started_at')}:")
+    prev_stages = {s['concurrency']: s for s in previous.get('stages', [])}
+    for stage in current['stages']:
+        prev = prev_stages.get(stage['concurrency'])
+        if not prev:
+            continue
+        for name, e in stage['endpoints'].items():
+            p = prev['endpoints'].get(name)
+            if not p:
+                continue
+            print(f"  c={stage['concurrency']:<4} {name:<9} rps {p['rps']} -> {e['rps']}  "
+                  f"p95 {p['p95_ms']} -> {e['p95_ms']}ms  p99 {p['p99_ms']} -> {e['p99_ms']}ms")
+
+
+async def run(args, mix):
+    run_id = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')
+    card_ids = load_card_ids(args.info)
+    timeout = aiohttp.ClientTimeout(total=args.timeout)
+    connector = aiohttp.TCPConnector(limit=0)
+
+    async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+        print(f"Creating {args.users} users against {args.base_url}")
+        tokens = await asyncio.gather(*[
+            create_user(session, args.base_url, run_id, i, card_ids, args.spending_per_user)
+            for i in range(args.users)
+        ])
+
+        stages = []
+        for concurrency in args.stages:
+            samples = []
+            started = time.perf_counter()
+            deadline = started + args.stage_duration
+            await asyncio.gather(*[
+                virtual_user(session, args.base_url, tokens[i % len(tokens)], mix, deadline, samples)
+                for i in range(concurrency)
+            ])
+            stage = summarize_stage(concurrency, time.perf_counter() - started, samples)
+            print_stage(stage)
+            stages.append(stage)
+
+    return {
+        'started_at': run_id,
+        'base_url': args.base_url,
+        'users': args.users,
+        'mix': mix,
+        'stages': stages,
+        'saturation_concurrency': find_saturation(stages),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the recommendation and spending APIs')
+
+    repo_root = Path(__file__).resolve().parent.parent
+    default_info = repo_root / 'script' / 'processed' / 'info_output.csv'
+    default_results = repo_root / 'script' / 'loadtest_results'
+
+    parser.add_argument('--base-url', default='http://localhost:3000', help='Server base URL')
+    parser.add_argument('--users', type=int, default=20, help='Distinct users to register')
+    parser.add_argument('--stages', default='1,5,10,25,50,100', help='Comma-separated concurrency levels to ramp through')
+    parser.add_argument('--stage-duration', type=float, default=15, help='Seconds per stage')
+    parser.add_argument('--mix', default='global=4,my-cards=3,spending=3', help='Weighted request mix')
+    parser.add_argument('--spending-per-user', type=int, default=20, help='Spending entries seeded per user')
+    parser.add_argument('--timeout', type=float, default=30, help='Per-request timeout in seconds')
+    parser.add_argument('--info', default=str(default_info), help='Info CSV to pick owned cards from')
+    parser.add_argument('--results-dir', default=str(default_results), help='Directory to save results JSON')
+    parser.add_argument('--compare', help='Previous results JSON to compare against')
+    args = parser.parse_args()
+
+    try:
+        mix = parse_mix(args.mix)
+        args.stages = [int(s) for s in args.stages.split(',') if s.strip()]
+    except ValueError as e:
+        print(e)
+        sys.exit(2)
+
+    try:
+        result = asyncio.run(run(args, mix))
+    except (aiohttp.ClientError, RuntimeError) as e:
+        print(f"Load test aborted: {e}")
+        sys.exit(1)
+
+    if result['saturation_concurrency']:
+        print(f"\nSaturation at concurrency {result['saturation_concurrency']}")
+    else:
+        print('\nNo saturation reached; try higher --stages')
+
+    results_dir = Path(args.results_dir)
+    results_dir.mkdir(parents=True, exist_ok=True)
+    output_path = results_dir / f"{result['started_at']}.json"
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2)
+    print(f"Results written to {output_path}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            print_comparison(json.load(f), result)
+
+
+if __name__ == '__main__':
+    main()
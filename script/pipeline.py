@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""
+Make-style stage graph for the data pipeline.
+
+Each stage declares its inputs and outputs (paths relative to `script/`):
+
+    scrape_boa ──────┐
+    scrape_chase ────┼─> transform ─┬─> clean ─> assets ─┬─> ingest
+    scrape_discover ─┘              └─> equiv ───────────┘
+
+A stage is skipped when the content hashes of its inputs (including its own
+source files) and its parameters match its last successful run and all of its
+outputs still exist. Stages whose dependencies are done run in parallel.
+
+State lives in `.pipeline_state.json` and is saved after every stage, so a
+failed run resumes where it stopped: finished stages are skipped and only the
+failed stage and everything downstream of it run again. `--from STAGE` forces a
+stage and its dependents to run; `--force` reruns everything.
+
+Usage examples:
+    python script/pipeline.py
+    python script/pipeline.py --dry-run
+    python script/pipeline.py clean equiv --jobs 2
+    python script/pipeline.py --from transform
+    python script/pipeline.py -- --snapshot-dir ./snapshot   (options after -- go to insert_csv_to_mongo.py)
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+STATE_FILE = SCRIPT_DIR / '.pipeline_state.json'
+HASH_CHUNK_SIZE = 1 << 20
+BANKS = {'boa': 'boa_cards.json', 'chase': 'chase_cards.json', 'discover': 'discover_cards.json'}
+
+
+def scrape_bank(bank):
+    # scrapers import their helpers as top-level modules (e.g. selenium_utils)
+    scrape_dir = str(SCRIPT_DIR / 'scrape')
+    if scrape_dir not in sys.path:
+        sys.path.insert(0, scrape_dir)
+    (SCRIPT_DIR / 'raw').mkdir(exist_ok=True)
+    import importlib
+    scraper = importlib.import_module(bank)
+    scraper.scrape_credit_card(scraper.ALL_CARDS_PATH)
+
+
+def transform():
+    import start
+    start.main()
+
+
+def clean():
+    import clean as clean_module
+    clean_module.clean_info()
+
+
+def equiv():
+    import compute_cashback_equiv
+    compute_cashback_equiv.main()
+
+
+def card_art_base_url():
+    # unset: thumbnails are cached but info keeps the banks' img_url
+    return os.getenv('CARD_ART_BASE_URL', '')
+
+
+def assets():
+    import card_art_assets
+    card_art_assets.process_assets(
+        SCRIPT_DIR / 'processed' / 'info_output_cleaned.csv',
+        SCRIPT_DIR / 'processed' / 'info_output_assets.csv',
+        SCRIPT_DIR / 'assets',
+        card_art_base_url(),
+    )
+
+
+def mongo_target(extra_args=()):
+    """The (URI, database) ingest will write to, resolved the way insert_csv_to_mongo.py does."""
+    from dotenv import load_dotenv
+    load_dotenv()
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument('--mongo-uri', default=os.getenv('MONGODB_URI', 'mongodb://localhost:27017'))
+    parser.add_argument('--db', default=os.getenv('MONGODB_DB', 'cardwise'))
+    args, _ = parser.parse_known_args(list(extra_args))
+    return [args.mongo_uri, args.db]
+
+
+def ingest(extra_args=()):
+    import insert_csv_to_mongo
+    # later occurrences win in argparse, so extra_args override these defaults
+    insert_csv_to_mongo.main([
+        '--info', str(SCRIPT_DIR / 'processed' / 'info_output_assets.csv'),
+        '--reward', str(SCRIPT_DIR / 'processed' / 'reward_output_cashback_equiv_processed.csv'),
+    ] + list(extra_args))
+
+
+class Stage:
+    def __init__(self, name, action, inputs, outputs, deps=(), params=()):
+        self.name = name
+        self.action = action
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.deps = list(deps)
+        self.params = list(params)
+
+
+def build_stages(ingest_args=()):
+    stages = []
+    for bank, raw_file in BANKS.items():
+        stages.append(Stage(
+            f"scrape_{bank}", lambda bank=bank: scrape_bank(bank),
+            inputs=[f"scrape/{bank}.py", 'scrape/selenium_utils.py'],
+            outputs=[f"raw/{raw_file}"],
+        ))
+    stages += [
+        Stage('transform', transform,
+              inputs=['raw/*.json', 'prompt/reward_prompt.txt', 'prompt/info_prompt.txt', 'start.py'],
+              outputs=['processed/reward_output.csv', 'processed/info_output.csv'],
+              deps=[f"scrape_{bank}" for bank in BANKS]),
+        Stage('clean', clean,
+              inputs=['processed/info_output.csv', 'clean.py'],
+              outputs=['processed/info_output_cleaned.csv'],
+              deps=['transform']),
+        Stage('equiv', equiv,
+              inputs=['processed/info_output.csv', 'processed/reward_output.csv', 'compute_cashback_equiv.py'],
+              outputs=['processed/reward_output_cashback_equiv_processed.csv'],
+              deps=['transform']),
+        Stage('assets', assets,
+              inputs=['processed/info_output_cleaned.csv', 'card_art_assets.py'],
+              outputs=['processed/info_output_assets.csv'],
+              deps=['clean'],
+              params=[card_art_base_url()]),
+        Stage('ingest', lambda: ingest(ingest_args),
+              inputs=['processed/info_output_assets.csv', 'processed/reward_output_cashback_equiv_processed.csv',
+                      'insert_csv_to_mongo.py'],
+              outputs=[],
+              deps=['assets', 'equiv'],
+              # ingest has no outputs to check, so a different target database must rerun it
+              # (only the hash of params is stored, so credentials in the URI stay out of the state file)
+              params=list(ingest_args) + mongo_target(ingest_args)),
+    ]
+    return {s.name: s for s in stages}
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_inputs(stage):
+    """sha256 per input file, globs expanded; missing inputs hash to None."""
+    hashes = {}
+    for pattern in stage.inputs:
+        paths = sorted(glob.glob(str(SCRIPT_DIR / pattern))) if any(c in pattern for c in '*?[') else [str(SCRIPT_DIR / pattern)]
+        for path in paths:
+            rel = os.path.relpath(path, SCRIPT_DIR)
+            try:
+                hashes[rel] = file_sha256(path)
+            except FileNotFoundError:
+                hashes[rel] = None
+    hashes['__params__'] = hashlib.sha256(json.dumps(stage.params).encode()).hexdigest()
+    return hashes
+
+
+def load_state():
+    try:
+        with open(STATE_FILE, encoding='utf-8') as fh:
+            return json.load(fh)
+    except FileNotFoundError:
+        return {}
+    except json.JSONDecodeError as e:
+        print(f"Warning: ignoring unreadable pipeline state {STATE_FILE}: {e}")
+        return {}
+
+
+def save_state(state):
+    tmp_path = STATE_FILE.with_name(STATE_FILE.name + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as fh:
+        json.dump(state, fh, indent=2, sort_keys=True)
+    tmp_path.replace(STATE_FILE)
+
+
+def is_up_to_date(stage, state, deps_ran=False):
+    """True if `stage` can be skipped.
+
+    A stage with no recorded run adopts outputs that already exist (e.g. the
+    committed processed CSVs), as long as nothing upstream ran this time;
+    the adoption is recorded in `state`.
+    """
+    outputs_exist = all((SCRIPT_DIR / out).exists() for out in stage.outputs)
+    previous = state.get(stage.name)
+    if not previous:
+        if stage.outputs and outputs_exist and not deps_ran:
+            state[stage.name] = {'status': 'ok', 'adopted': True, 'inputs': hash_inputs(stage)}
+            return True
+        return False
+    if previous.get('status') != 'ok' or not outputs_exist:
+        return False
+    return previous.get('inputs') == hash_inputs(stage)
+
+
+def select_stages(stages, targets):
+    """Targets plus everything they depend on."""
+    selected = set()
+    pending = list(targets)
+    while pending:
+        name = pending.pop()
+        if name not in selected:
+            selected.add(name)
+            pending.extend(stages[name].deps)
+    return selected
+
+
+def downstream_of(stages, name):
+    found = {name}
+    changed = True
+    while changed:
+        changed = False
+        for s in stages.values():
+            if s.name not in found and found.intersection(s.deps):
+                found.add(s.name)
+                changed = True
+    return found
+
+
+def run_pipeline(targets=('ingest',), force=False, from_stage=None, jobs=4, dry_run=False, ingest_args=()):
+    """Run `targets` and their dependencies. Returns True if every stage succeeded."""
+    os.chdir(SCRIPT_DIR)
+    if str(SCRIPT_DIR) not in sys.path:
+        sys.path.insert(0, str(SCRIPT_DIR))
+
+    stages = build_stages(ingest_args)
+    unknown = [n for n in list(targets) + ([from_stage] if from_stage else []) if n not in stages]
+    if unknown:
+        raise ValueError(f"Unknown stage(s): {', '.join(unknown)}")
+    selected = select_stages(stages, targets)
+    forced = set(selected) if force else (downstream_of(stages, from_stage) if from_stage else set())
+    state = load_state()
+
+    if dry_run:
+        # without running, assume anything forced or stale also makes its dependents stale
+        stale = set()
+        for name in topo_order(stages, selected):
+            stage = stages[name]
+            deps_stale = bool(stale.intersection(stage.deps))
+            if name in forced or deps_stale or not is_up_to_date(stage, state, deps_stale):
+                stale.add(name)
+            print(f"[dry-run] {name}: {'run' if name in stale else 'up to date, skip'}")
+        return True
+
+    done, failed, blocked, ran = set(), set(), set(), set()
+    running = {}
+    with ThreadPoolExecutor(max_workers=max(jobs, 1)) as pool:
+        while True:
+            for name in topo_order(stages, selected):
+                stage = stages[name]
+                if name in done or name in failed or name in blocked or name in running.values():
+                    continue
+                if (failed | blocked).intersection(stage.deps):
+                    print(f"{name}: skipped, a dependency failed")
+                    blocked.add(name)
+                    continue
+                if not set(stage.deps) <= done:
+                    continue
+                if name not in forced and is_up_to_date(stage, state, bool(ran.intersection(stage.deps))):
+                    print(f"{name}: up to date, skipping")
+                    done.add(name)
+                    continue
+                print(f"{name}: running")
+                ran.add(name)
+                running[pool.submit(run_stage, stage)] = name
+
+            if not running:
+                break
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                ok, elapsed, error = future.result()
+                entry = {'finished_at': datetime.now(timezone.utc).isoformat(), 'seconds': round(elapsed, 2)}
+                if ok:
+                    done.add(name)
+                    entry.update(status='ok', inputs=hash_inputs(stages[name]))
+                    print(f"{name}: done in {elapsed:.2f}s")
+                else:
+                    failed.add(name)
+                    entry.update(status='failed', error=error)
+                    print(f"{name}: FAILED after {elapsed:.2f}s: {error}")
+                state[name] = entry
+                save_state(state)
+
+    # persist any outputs adopted while checking for staleness
+    save_state(state)
+    if failed:
+        print(f"Pipeline failed at: {', '.join(sorted(failed))}. Re-run to resume from there.")
+        if blocked:
+            print(f"Not run: {', '.join(sorted(blocked))}")
+    return not failed
+
+
+def run_stage(stage):
+    """Run one stage action. Returns (ok, seconds, error message)."""
+    started = time.perf_counter()
+    try:
+        stage.action()
+    except SystemExit as e:
+        # the wrapped scripts report errors with sys.exit
+        if e.code not in (None, 0):
+            return False, time.perf_counter() - started, f"exited with status {e.code}"
+    except Exception as e:
+        return False, time.perf_counter() - started, f"{type(e).__name__}: {e}"
+    missing = [out for out in stage.outputs if not (SCRIPT_DIR / out).exists()]
+    if missing:
+        return False, time.perf_counter() - started, f"outputs not produced: {', '.join(missing)}"
+    return True, time.perf_counter() - started, None
+
+
+def topo_order(stages, selected):
+    order, seen = [], set()
+
+    def visit(name):
+        if name in seen:
+            return
+        seen.add(name)
+        for dep in stages[name].deps:
+            visit(dep)
+        order.append(name)
+
+    for name in sorted(selected):
+        visit(name)
+    return order
+
+
+def main(argv=None):
+    stage_names = list(build_stages())
+    parser = argparse.ArgumentParser(description='Run pipeline stages, skipping the ones that are up to date')
+    parser.add_argument('targets', nargs='*', help='Stages to bring up to date (default: ingest)')
+    parser.add_argument('--force', action='store_true', help='Rerun every selected stage')
+    parser.add_argument('--from', dest='from_stage', choices=stage_names, help='Force this stage and everything downstream of it')
+    parser.add_argument('--jobs', type=int, default=4, help='Stages to run in parallel')
+    parser.add_argument('--dry-run', action='store_true', help='Show what would run without running it')
+    argv = sys.argv[1:] if argv is None else list(argv)
+    # everything after `--` is handed to insert_csv_to_mongo.py by the ingest stage
+    ingest_args = []
+    if '--' in argv:
+        split = argv.index('--')
+        argv, ingest_args = argv[:split], argv[split + 1:]
+    args = parser.parse_args(argv)
+    unknown = [t for t in args.targets if t not in stage_names]
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(unknown)} (choose from {', '.join(stage_names)})")
+
+    ok = run_pipeline(args.targets or ['ingest'], args.force, args.from_stage, args.jobs, args.dry_run, ingest_args)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
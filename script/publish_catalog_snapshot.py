@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Publish a versioned, content-hashed snapshot of the card catalog.
+
+The snapshot bundles everything the ranking/recommendation endpoints read from
+the `info` and `reward` collections:
+- cards: card metadata keyed by card_id
+- rewards: card_id -> {category: cashback_equiv_pct} matrix
+- rankings: per-category ranking (same ordering rules as /api/recommendations/global)
+
+Output (in --out-dir, default `script/snapshot/`):
+- catalog.<hash>.json      compact JSON
+- catalog.<hash>.json.gz   gzip variant
+- catalog.<hash>.json.br   brotli variant (only if the `brotli` package is installed)
+- manifest.json            version, content hash, ETag and file list
+
+A new snapshot is only written when the content hash changes, so the files are
+safe to cache forever and the manifest is the only thing that needs revalidating.
+
+Usage examples:
+    python script/publish_catalog_snapshot.py
+    python script/publish_catalog_snapshot.py --info ./script/processed/info_output.csv --out-dir ./public/catalog
+"""
+import argparse
+import csv
+import gzip
+import hashlib
+import json
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+from compute_cashback_equiv import compute_cashback_equiv
+
+SNAPSHOT_SCHEMA_VERSION = 1
+MANIFEST_NAME = 'manifest.json'
+FALLBACK_CATEGORY = 'all'
+
+
+def parse_number(value, default=0):
+    if value is None:
+        return default
+    try:
+        v = str(value).strip()
+        if v == "" or v.upper() == "NULL":
+            return default
+        n = float(v)
+        return int(n) if n.is_integer() else n
+    except Exception:
+        return default
+
+
+def load_cards(info_path):
+    """Load card metadata from info CSV, keyed by card_id."""
+    cards = {}
+    with open(info_path, newline='', encoding='utf-8') as fh:
+        reader = csv.DictReader(fh)
+        for row in reader:
+            card_id = (row.get('card_id') or '').strip()
+            if not card_id:
+                continue
+            cards[card_id] = {
+                'card_id': card_id,
+                'card_name': (row.get('card_name') or '').strip(),
+                'card_type': (row.get('card_type') or '').strip(),
+                'bank_id': (row.get('bank_id') or '').strip(),
+                'img_url': (row.get('img_url') or '').strip(),
+                'annual_fee': parse_number(row.get('annual_fee'), 0),
+            }
+    return cards
+
+
+def load_reward_matrix(reward_path, cards):
+    """Load card_id -> {category: cashback_equiv_pct} from reward CSV.
+
+    Uses the `cashback_equiv_pct` column when present, otherwise derives it
+    with the same bank conversion rules as compute_cashback_equiv.py.
+    """
+    matrix = {}
+    with open(reward_path, newline='', encoding='utf-8') as fh:
+        reader = csv.DictReader(fh)
+        for row in reader:
+            card_id = (row.get('card_id') or '').strip()
+            category = (row.get('category') or '').strip()
+            if not card_id or not category:
+                continue
+            if (row.get('cashback_equiv_pct') or '').strip():
+                pct = parse_number(row.get('cashback_equiv_pct'), 0)
+            else:
+                bank_id = cards.get(card_id, {}).get('bank_id', 'unknown')
+                pct = compute_cashback_equiv(
+                    parse_number(row.get('cashback_pct'), 0),
+                    parse_number(row.get('point_mul'), 0),
+                    bank_id,
+                )
+            per_card = matrix.setdefault(card_id, {})
+            # keep the best value if a category is listed twice
+            if pct > per_card.get(category, float('-inf')):
+                per_card[category] = pct
+    return matrix
+
+
+def build_rankings(cards, matrix):
+    """Rank cards per category, falling back to the card's "all" rate.
+
+    Mirrors getGlobalRanking: descending by cashback_equiv_pct, then
+    ascending by annual_fee.
+    """
+    categories = sorted({c for per_card in matrix.values() for c in per_card})
+    rankings = {}
+    for category in categories:
+        entries = []
+        for card_id, per_card in matrix.items():
+            if category in per_card:
+                best_category = category
+            elif FALLBACK_CATEGORY in per_card:
+                best_category = FALLBACK_CATEGORY
+            else:
+                continue
+            entries.append({
+                'card_id': card_id,
+                'best_category': best_category,
+                'best_cashback_equiv_pct': per_card[best_category],
+            })
+        entries.sort(key=lambda e: (
+            -e['best_cashback_equiv_pct'],
+            cards.get(e['card_id'], {}).get('annual_fee') or 0,
+            e['card_id'],
+        ))
+        rankings[category] = entries
+    return rankings
+
+
+def build_catalog(info_path, reward_path):
+    cards = load_cards(info_path)
+    matrix = load_reward_matrix(reward_path, cards)
+    return {
+        'schema_version': SNAPSHOT_SCHEMA_VERSION,
+        'cards': cards,
+        'rewards': matrix,
+        'rankings': build_rankings(cards, matrix),
+    }
+
+
+def encode_catalog(catalog):
+    """Serialize deterministically so identical content hashes identically."""
+    return json.dumps(catalog, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def load_manifest(out_dir):
+    manifest_path = Path(out_dir) / MANIFEST_NAME
+    if not manifest_path.is_file():
+        return None
+    try:
+        with open(manifest_path, encoding='utf-8') as fh:
+            return json.load(fh)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Warning: ignoring unreadable manifest {manifest_path}: {e}")
+        return None
+
+
+def _write_bytes(path, data):
+    # write-then-rename so readers never see a half-written file
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'wb') as fh:
+        fh.write(data)
+    tmp_path.replace(path)
+
+
+def _file_entry(path, data):
+    return {
+        'path': path.name,
+        'bytes': len(data),
+        'etag': f'"{hashlib.sha256(data).hexdigest()[:32]}"',
+    }
+
+
+def publish_snapshot(info_path, reward_path, out_dir, force=False):
+    """Build the catalog and write a new snapshot if its content changed.
+
+    Returns (manifest, written) where `written` is False when the existing
+    snapshot already matched the content hash.
+    """
+    out_dir = Path(out_dir)
+    payload = encode_catalog(build_catalog(info_path, reward_path))
+    content_hash = hashlib.sha256(payload).hexdigest()
+
+    previous = load_manifest(out_dir)
+    if previous and previous.get('content_hash') == content_hash and not force:
+        return previous, False
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    stem = f"catalog.{content_hash[:16]}.json"
+    variants = {'json': (out_dir / stem, payload)}
+    variants['gzip'] = (out_dir / (stem + '.gz'), gzip.compress(payload, compresslevel=9, mtime=0))
+    try:
+        import brotli
+        variants['br'] = (out_dir / (stem + '.br'), brotli.compress(payload, quality=11))
+    except ImportError:
+        pass
+
+    files = {}
+    for name, (path, data) in variants.items():
+        _write_bytes(path, data)
+        files[name] = _file_entry(path, data)
+
+    manifest = {
+        'version': (previous or {}).get('version', 0) + 1,
+        'schema_version': SNAPSHOT_SCHEMA_VERSION,
+        'content_hash': content_hash,
+        'etag': f'"{content_hash[:32]}"',
+        'generated_at': datetime.now(timezone.utc).isoformat(),
+        'files': files,
+    }
+    # manifest goes last: it is the pointer readers follow
+    _write_bytes(out_dir / MANIFEST_NAME, json.dumps(manifest, indent=2).encode('utf-8'))
+    return manifest, True
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Publish a content-hashed catalog snapshot')
+
+    repo_root = Path(__file__).resolve().parent.parent
+    default_info = repo_root / 'script' / 'processed' / 'info_output.csv'
+    default_reward = repo_root / 'script' / 'processed' / 'reward_output_cashback_equiv_processed.csv'
+    default_out = repo_root / 'script' / 'snapshot'
+
+    parser.add_argument('--info', default=str(default_info), help='Path to info CSV')
+    parser.add_argument('--reward', default=str(default_reward), help='Path to reward CSV (with or without cashback_equiv_pct)')
+    parser.add_argument('--out-dir', default=str(default_out), help='Directory to publish the snapshot into')
+    parser.add_argument('--force', action='store_true', help='Write a new snapshot even if the content hash is unchanged')
+    args = parser.parse_args()
+
+    if not Path(args.info).is_file():
+        print(f"Info CSV not found: {args.info}")
+        sys.exit(2)
+    if not Path(args.reward).is_file():
+        print(f"Reward CSV not found: {args.reward}")
+        sys.exit(2)
+
+    manifest, written = publish_snapshot(args.info, args.reward, args.out_dir, force=args.force)
+    if written:
+        print(f"✓ Snapshot v{manifest['version']} written to {args.out_dir}")
+        for name, entry in manifest['files'].items():
+            print(f"  {name}: {entry['path']} ({entry['bytes']} bytes)")
+    else:
+        print(f"Snapshot unchanged (v{manifest['version']}, {manifest['content_hash'][:16]}), nothing written")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,17 +1,16 @@
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-
-
 def get_page_source(url, required_div_id, use_undetected=False, scroll_to_bottom=False):
     """Fetch page source for `url` and wait for an element with `required_div_id`.
 
     This function initializes `driver` lazily and ensures `driver.quit()` is only
     called when a driver instance was created to avoid UnboundLocalError when
     driver initialization fails (e.g., missing browser binary).
+
+    selenium is imported lazily so importing this module stays cheap.
     """
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+
     driver = None
     try:
         if use_undetected:
@@ -48,6 +47,9 @@ def get_page_source(url, required_div_id, use_undetected=False, scroll_to_bottom
 
 def __init_driver():
     """Initialize and return a headless Chrome WebDriver."""
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+
     options = Options()
     options.headless = True
     options.add_argument("--headless=new")
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Monte Carlo simulation of the annual net reward value of every card.
+
+A single "best card" point estimate hides how much a user's spending moves
+around. This script fits a per-category monthly spending distribution to a
+user's history, samples thousands of yearly scenarios and values every card
+against every scenario in one matrix product:
+
+    annual_spend (scenarios x categories) @ rates.T (categories x cards) / 100 - annual_fee
+
+Model per category (fit from monthly totals):
+- the category has spend in a month with probability p_active
+- when active, the monthly total is lognormal(mu, sigma)
+
+Spending in categories the reward table doesn't know is valued at each card's
+"all" rate. Per-category rates fall back to "all", the same rule as
+/api/recommendations/global.
+
+Inputs:
+- catalog: info + reward CSVs (same files as publish_catalog_snapshot.py)
+- spending: `--spending-csv` (columns: date, category, amount) or a user's
+  `spendings` from MongoDB via `--user-id`
+
+Usage examples:
+    python script/simulate_card_value.py --spending-csv ./my_spending.csv
+    python script/simulate_card_value.py --user-id 6561f0c2a1b2c3d4e5f60718 --scenarios 20000 --workers 4
+"""
+import os
+import argparse
+import csv
+import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from publish_catalog_snapshot import load_cards, load_reward_matrix
+
+FALLBACK_CATEGORY = 'all'
+MONTHS_PER_YEAR = 12
+# spread assumed when a category has fewer than two active months to fit from
+DEFAULT_SIGMA = 0.5
+PERCENTILES = (5, 25, 50, 75, 95)
+
+
+def build_rate_matrix(cards, matrix):
+    """Return (card_ids, categories, rates[cards x categories], fees[cards])."""
+    card_ids = sorted(set(cards) & set(matrix))
+    categories = sorted({c for per_card in matrix.values() for c in per_card} - {FALLBACK_CATEGORY})
+    categories.append(FALLBACK_CATEGORY)
+
+    rates = np.zeros((len(card_ids), len(categories)))
+    for i, card_id in enumerate(card_ids):
+        per_card = matrix[card_id]
+        fallback = per_card.get(FALLBACK_CATEGORY, 0)
+        for j, category in enumerate(categories):
+            rates[i, j] = per_card.get(category, fallback)
+    fees = np.array([float(cards[c].get('annual_fee') or 0) for c in card_ids])
+    return card_ids, categories, rates, fees
+
+
+def load_spending_csv(path):
+    """Yield (month 'YYYY-MM', category, amount) from a CSV with date, category, amount."""
+    with open(path, newline='', encoding='utf-8') as fh:
+        for row in csv.DictReader(fh):
+            try:
+                amount = float(row.get('amount') or 0)
+            except ValueError:
+                continue
+            date = (row.get('date') or '').strip()
+            if len(date) < 7 or amount <= 0:
+                continue
+            yield date[:7], (row.get('category') or '').strip().lower(), amount
+
+
+def load_spending_mongo(mongo_uri, db_name, user_id):
+    """Yield (month, category, amount) for one user's `spendings` documents."""
+    # imported here so CSV-only runs don't need the Mongo driver installed
+    from bson import ObjectId
+    from pymongo import MongoClient
+
+    client = MongoClient(mongo_uri, serverSelectionTimeoutMS=5000)
+    pipeline = [
+        {'$match': {'userId': ObjectId(user_id)}},
+        {'$group': {
+            '_id': {
+                'month': {'$dateToString': {'format': '%Y-%m', 'date': '$date'}},
+                'category': {'$toLower': {'$trim': {'input': '$category'}}},
+            },
+            'amount': {'$sum': '$amount'},
+        }},
+    ]
+    for doc in client[db_name]['spendings'].aggregate(pipeline):
+        yield doc['_id']['month'], doc['_id']['category'], doc['amount']
+
+
+def fit_spending_model(records, categories):
+    """Fit (p_active, mu, sigma) per category from (month, category, amount) records."""
+    col = {c: j for j, c in enumerate(categories)}
+    fallback_col = col[FALLBACK_CATEGORY]
+    monthly = {}
+    for month, category, amount in records:
+        row = monthly.setdefault(month, np.zeros(len(categories)))
+        row[col.get(category, fallback_col)] += amount
+    if not monthly:
+        raise ValueError('No spending history to fit')
+
+    totals = np.vstack(list(monthly.values()))
+    p_active = (totals > 0).mean(axis=0)
+    mu = np.zeros(len(categories))
+    sigma = np.full(len(categories), DEFAULT_SIGMA)
+    for j in range(len(categories)):
+        positive = totals[totals[:, j] > 0, j]
+        if positive.size:
+            logs = np.log(positive)
+            mu[j] = logs.mean()
+            if positive.size > 1:
+                sigma[j] = max(logs.std(ddof=1), 1e-6)
+    return p_active, mu, sigma
+
+
+def simulate_chunk(seed, n_scenarios, p_active, mu, sigma, rates, fees):
+    """Net annual value per scenario and card: array of shape (n_scenarios, cards)."""
+    rng = np.random.default_rng(seed)
+    shape = (n_scenarios, MONTHS_PER_YEAR, len(mu))
+    active = rng.random(shape) < p_active
+    amounts = rng.lognormal(mu, sigma, shape)
+    annual_spend = (amounts * active).sum(axis=1)
+    return annual_spend @ (rates.T / 100.0) - fees
+
+
+def simulate(p_active, mu, sigma, rates, fees, n_scenarios=10000, seed=0, workers=1):
+    """Run the simulation, optionally split across a process pool."""
+    seeds = np.random.SeedSequence(seed).spawn(max(workers, 1))
+    if workers <= 1:
+        return simulate_chunk(seeds[0], n_scenarios, p_active, mu, sigma, rates, fees)
+
+    sizes = [n_scenarios // workers + (i < n_scenarios % workers) for i in range(workers)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(simulate_chunk, s, n, p_active, mu, sigma, rates, fees)
+            for s, n in zip(seeds, sizes) if n
+        ]
+        return np.vstack([f.result() for f in futures])
+
+
+def summarize(card_ids, cards, values):
+    """Expected value, percentile bands and P(best) per card, best first."""
+    means = values.mean(axis=0)
+    bands = np.percentile(values, PERCENTILES, axis=0)
+    # cards tied for best in a scenario share that scenario's win equally
+    is_best = values == values.max(axis=1, keepdims=True)
+    p_best = (is_best / is_best.sum(axis=1, keepdims=True)).sum(axis=0) / values.shape[0]
+    results = []
+    for i in np.argsort(-means):
+        results.append({
+            'card_id': card_ids[i],
+            'card_name': cards[card_ids[i]].get('card_name'),
+            'annual_fee': cards[card_ids[i]].get('annual_fee'),
+            'expected_net_value': round(float(means[i]), 2),
+            'percentiles': {f'p{p}': round(float(bands[k, i]), 2) for k, p in enumerate(PERCENTILES)},
+            'p_best': round(float(p_best[i]), 4),
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Simulate annual net reward value per card')
+
+    repo_root = Path(__file__).resolve().parent.parent
+    default_info = repo_root / 'script' / 'processed' / 'info_output.csv'
+    default_reward = repo_root / 'script' / 'processed' / 'reward_output_cashback_equiv_processed.csv'
+
+    parser.add_argument('--info', default=str(default_info), help='Path to info CSV')
+    parser.add_argument('--reward', default=str(default_reward), help='Path to reward CSV')
+    parser.add_argument('--spending-csv', help='Spending history CSV (date, category, amount)')
+    parser.add_argument('--user-id', help='Load spending history for this user from MongoDB instead')
+    parser.add_argument('--mongo-uri', default=os.getenv('MONGODB_URI', 'mongodb://localhost:27017'), help='MongoDB URI')
+    parser.add_argument('--db', default=os.getenv('MONGODB_DB', 'cardwise'), help='Database name')
+    parser.add_argument('--scenarios', type=int, default=10000, help='Number of simulated years')
+    parser.add_argument('--workers', type=int, default=1, help='Processes to spread scenarios across')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed')
+    parser.add_argument('--top', type=int, default=10, help='Cards to print')
+    parser.add_argument('--output', help='Write full results as JSON to this path')
+    args = parser.parse_args()
+
+    if not args.spending_csv and not args.user_id:
+        parser.error('one of --spending-csv or --user-id is required')
+    for path in (args.info, args.reward, args.spending_csv):
+        if path and not Path(path).is_file():
+            print(f"File not found: {path}")
+            sys.exit(2)
+
+    cards = load_cards(args.info)
+    card_ids, categories, rates, fees = build_rate_matrix(cards, load_reward_matrix(args.reward, cards))
+    if not card_ids:
+        print('No cards with rewards found in the catalog')
+        sys.exit(1)
+
+    if args.spending_csv:
+        records = load_spending_csv(args.spending_csv)
+    else:
+        records = load_spending_mongo(args.mongo_uri, args.db, args.user_id)
+    try:
+        p_active, mu, sigma = fit_spending_model(records, categories)
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+
+    started = time.perf_counter()
+    values = simulate(p_active, mu, sigma, rates, fees, args.scenarios, args.seed, args.workers)
+    results = summarize(card_ids, cards, values)
+    elapsed = time.perf_counter() - started
+
+    print(f"Simulated {args.scenarios} years x {len(card_ids)} cards in {elapsed * 1000:.0f} ms")
+    for r in results[:args.top]:
+        p = r['percentiles']
+        print(f"  {r['card_id']:<55} E=${r['expected_net_value']:>9.2f}  "
+              f"p5=${p['p5']:>9.2f}  p95=${p['p95']:>9.2f}  P(best)={r['p_best']:.2f}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'scenarios': args.scenarios, 'seed': args.seed, 'results': results}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
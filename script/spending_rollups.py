@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Maintain per-user, per-month, per-category spending rollups in MongoDB.
+
+Each rollup cell (userId, month, category) stores:
+- total_amount / txn_count: sums over the raw `spendings` documents
+- earned: rewards earned with the cards actually used (cashback_equiv_pct)
+- best_card_id / best_earned: what the best card the user owns would have earned
+- missed: best_earned - earned ("missed rewards")
+
+The job is incremental: it keeps a high-water mark on (`updatedAt`, `_id`) in
+the `job_state` collection and only recomputes the users with spending created
+or updated since the last run. For those users every month is recomputed, both
+the months in their changed spending and the months they already have rollups
+for, so an edit that moves a spending's `date` to another month also fixes the
+month it left. Aggregation runs inside Mongo; results are written with a single
+bulk_write per batch.
+
+Deleted spending documents leave no trace to detect, so run with `--full`
+periodically (or after bulk deletes). It recomputes every cell that has spending
+or an existing rollup, which removes the rollups of months that no longer have
+any spending.
+
+Defaults:
+- Mongo URI: from env var `MONGODB_URI` or `mongodb://localhost:27017`
+- DB name: from env var `MONGODB_DB` or `cardwise`
+
+Usage examples:
+    python script/spending_rollups.py
+    python script/spending_rollups.py --full --batch-size 500
+"""
+import os
+import argparse
+import sys
+from datetime import datetime, timezone
+from pymongo import MongoClient, ReplaceOne, DeleteMany, errors
+from dotenv import load_dotenv
+
+JOB_NAME = 'spending_rollups'
+FALLBACK_CATEGORY = 'all'
+
+# Spending categories are free text; map common variants onto reward categories
+CATEGORY_ALIASES = {
+    'groceries': 'grocery',
+    'restaurants': 'dining',
+    'restaurant': 'dining',
+    'pharmacy': 'pharma',
+    'general': 'all',
+}
+
+
+def normalize_category(category):
+    c = (category or '').strip().lower()
+    return CATEGORY_ALIASES.get(c, c)
+
+
+def month_bounds(month):
+    """Return [start, end) datetimes for a 'YYYY-MM' month string."""
+    year, mon = (int(p) for p in month.split('-'))
+    start = datetime(year, mon, 1, tzinfo=timezone.utc)
+    end = datetime(year + (mon == 12), mon % 12 + 1, 1, tzinfo=timezone.utc)
+    return start, end
+
+
+def load_reward_rates(db):
+    """card_id -> {category: cashback_equiv_pct}"""
+    rates = {}
+    for r in db['reward'].find({}, {'card_id': 1, 'category': 1, 'cashback_equiv_pct': 1}):
+        per_card = rates.setdefault(r['card_id'], {})
+        pct = r.get('cashback_equiv_pct') or 0
+        if pct > per_card.get(r['category'], float('-inf')):
+            per_card[r['category']] = pct
+    return rates
+
+
+def reward_rate(rates, card_id, category):
+    per_card = rates.get(card_id) or {}
+    if category in per_card:
+        return per_card[category]
+    return per_card.get(FALLBACK_CATEGORY, 0)
+
+
+def best_owned_card(rates, owned_cards, category):
+    best_id, best_rate = None, 0
+    for card_id in owned_cards:
+        rate = reward_rate(rates, card_id, category)
+        if rate > best_rate:
+            best_id, best_rate = card_id, rate
+    return best_id, best_rate
+
+
+def _after(mark):
+    """Filter for spending strictly after a (updatedAt, _id) high-water mark."""
+    return {'$or': [
+        {'updatedAt': {'$gt': mark['updatedAt']}},
+        {'updatedAt': mark['updatedAt'], '_id': {'$gt': mark['_id']}},
+    ]}
+
+
+def _up_to(mark):
+    """Filter for spending at or before a (updatedAt, _id) high-water mark."""
+    return {'$or': [
+        {'updatedAt': {'$lt': mark['updatedAt']}},
+        {'updatedAt': mark['updatedAt'], '_id': {'$lte': mark['_id']}},
+    ]}
+
+
+def find_dirty_cells(spendings, since):
+    """Return ({(userId, month)}, new high-water mark) for spending changed after `since`.
+
+    The mark is the (updatedAt, _id) of the newest spending document; `_id`
+    breaks ties between documents updated in the same millisecond. The new
+    mark is read first and the scan bounded by it, so documents written
+    during the run are left for the next one.
+    """
+    latest = spendings.find_one({}, {'updatedAt': 1}, sort=[('updatedAt', -1), ('_id', -1)])
+    if latest is None:
+        return set(), since
+    high_water = {'updatedAt': latest['updatedAt'], '_id': latest['_id']}
+    if since == high_water:
+        return set(), since
+
+    conditions = [_up_to(high_water)] + ([_after(since)] if since else [])
+    pipeline = [
+        {'$match': {'$and': conditions}},
+        {'$group': {
+            '_id': {
+                'userId': '$userId',
+                'month': {'$dateToString': {'format': '%Y-%m', 'date': '$date'}},
+            },
+        }},
+    ]
+    cells = {(doc['_id']['userId'], doc['_id']['month']) for doc in spendings.aggregate(pipeline, allowDiskUse=True)}
+    return cells, high_water
+
+
+def existing_cells(rollups, user_ids=None):
+    """(userId, month) pairs that already have rollups, for `user_ids` or for everyone."""
+    pipeline = [{'$group': {'_id': {'userId': '$userId', 'month': '$month'}}}]
+    if user_ids is not None:
+        pipeline.insert(0, {'$match': {'userId': {'$in': list(user_ids)}}})
+    return {(doc['_id']['userId'], doc['_id']['month']) for doc in rollups.aggregate(pipeline, allowDiskUse=True)}
+
+
+def aggregate_cells(spendings, cells):
+    """Sum spending per (userId, month, category, cardId) for the given cells."""
+    pipeline = [
+        {'$match': {'$or': [
+            {'userId': user_id, 'date': {'$gte': start, '$lt': end}}
+            for user_id, (start, end) in ((u, month_bounds(m)) for u, m in cells)
+        ]}},
+        {'$group': {
+            '_id': {
+                'userId': '$userId',
+                'month': {'$dateToString': {'format': '%Y-%m', 'date': '$date'}},
+                'category': {'$toLower': {'$trim': {'input': '$category'}}},
+                'cardId': '$cardId',
+            },
+            'amount': {'$sum': '$amount'},
+            'count': {'$sum': 1},
+        }},
+    ]
+    return spendings.aggregate(pipeline, allowDiskUse=True)
+
+
+def build_rollups(groups, rates, card_ids_by_oid, owned_by_user):
+    """Fold per-card groups into rollup cells and price them against the reward table."""
+    cells = {}
+    for g in groups:
+        key = g['_id']
+        category = normalize_category(key['category'])
+        cell_key = (key['userId'], key['month'], category)
+        cell = cells.setdefault(cell_key, {'total_amount': 0, 'txn_count': 0, 'earned': 0, 'by_card': {}})
+        amount = g['amount'] or 0
+        card_id = card_ids_by_oid.get(key.get('cardId'))
+        cell['total_amount'] += amount
+        cell['txn_count'] += g['count']
+        if card_id:
+            cell['earned'] += amount * reward_rate(rates, card_id, category) / 100
+            cell['by_card'][card_id] = cell['by_card'].get(card_id, 0) + amount
+
+    now = datetime.now(timezone.utc)
+    for (user_id, month, category), cell in cells.items():
+        best_id, best_rate = best_owned_card(rates, owned_by_user.get(user_id, []), category)
+        best_earned = cell['total_amount'] * best_rate / 100
+        yield {
+            'userId': user_id,
+            'month': month,
+            'category': category,
+            'total_amount': round(cell['total_amount'], 2),
+            'txn_count': cell['txn_count'],
+            'earned': round(cell['earned'], 2),
+            'best_card_id': best_id,
+            'best_cashback_equiv_pct': best_rate,
+            'best_earned': round(best_earned, 2),
+            'missed': round(max(best_earned - cell['earned'], 0), 2),
+            'by_card': {k: round(v, 2) for k, v in cell['by_card'].items()},
+            'updatedAt': now,
+        }
+
+
+def _chunks(items, size):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def run_rollups(db, full=False, batch_size=200):
+    """Recompute dirty cells and advance the high-water mark.
+
+    Returns (cells_recomputed, docs_written).
+    """
+    state_coll = db['job_state']
+    state = state_coll.find_one({'_id': JOB_NAME}) or {}
+    since = None if full else state.get('high_water_mark')
+    if not isinstance(since, dict):
+        # no mark yet (or one from before _id was tracked): rebuild everything
+        since = None
+
+    rollup_coll = db[JOB_NAME]
+    dirty, high_water = find_dirty_cells(db['spendings'], since)
+    if since is None:
+        # full rebuild: also revisit cells whose spending is gone, so they get removed
+        dirty |= existing_cells(rollup_coll)
+    elif dirty:
+        # a spending whose date moved leaves its old month behind; revisit the user's other months
+        for users in _chunks({u for u, _ in dirty}, batch_size):
+            dirty |= existing_cells(rollup_coll, users)
+    if not dirty:
+        return 0, 0
+
+    rates = load_reward_rates(db)
+    card_ids_by_oid = {c['_id']: c['card_id'] for c in db['info'].find({}, {'card_id': 1})}
+
+    written = 0
+    for batch in _chunks(sorted(dirty, key=lambda c: (str(c[0]), c[1])), batch_size):
+        user_ids = list({u for u, _ in batch})
+        owned_by_user = {
+            u['_id']: u.get('ownedCards') or []
+            for u in db['users'].find({'_id': {'$in': user_ids}}, {'ownedCards': 1})
+        }
+        rollups = list(build_rollups(aggregate_cells(db['spendings'], batch), rates, card_ids_by_oid, owned_by_user))
+
+        ops = [
+            ReplaceOne({'userId': r['userId'], 'month': r['month'], 'category': r['category']}, r, upsert=True)
+            for r in rollups
+        ]
+        # drop cells whose spending moved to another category (or was removed)
+        seen = {}
+        for r in rollups:
+            seen.setdefault((r['userId'], r['month']), []).append(r['category'])
+        for user_id, month in batch:
+            ops.append(DeleteMany({
+                'userId': user_id,
+                'month': month,
+                'category': {'$nin': seen.get((user_id, month), [])},
+            }))
+        rollup_coll.bulk_write(ops, ordered=False)
+        written += len(rollups)
+
+    state_coll.update_one(
+        {'_id': JOB_NAME},
+        {'$set': {'high_water_mark': high_water, 'lastRunAt': datetime.now(timezone.utc)}},
+        upsert=True,
+    )
+    return len(dirty), written
+
+
+def ensure_indexes(db):
+    try:
+        db[JOB_NAME].create_index([('userId', 1), ('month', 1), ('category', 1)], unique=True)
+        db['spendings'].create_index([('updatedAt', 1), ('_id', 1)])
+        db['spendings'].create_index([('userId', 1), ('date', 1)])
+    except errors.OperationFailure as e:
+        print(f"Warning: could not create index: {e}")
+
+
+def main():
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description='Incrementally roll up spending per user, month and category')
+    parser.add_argument('--mongo-uri', default=os.getenv('MONGODB_URI', 'mongodb://localhost:27017'), help='MongoDB URI')
+    parser.add_argument('--db', default=os.getenv('MONGODB_DB', 'cardwise'), help='Database name')
+    parser.add_argument('--full', action='store_true', help='Ignore the high-water mark and rebuild every cell')
+    parser.add_argument('--batch-size', type=int, default=200, help='(user, month) cells recomputed per bulk write')
+    args = parser.parse_args()
+
+    print(f"Connecting to MongoDB at {args.mongo_uri}, db={args.db}")
+    try:
+        client = MongoClient(args.mongo_uri, serverSelectionTimeoutMS=5000)
+        client.admin.command('ping')
+    except Exception as e:
+        print(f"Failed to connect to MongoDB: {e}")
+        sys.exit(1)
+
+    db = client[args.db]
+    ensure_indexes(db)
+
+    cells, written = run_rollups(db, full=args.full, batch_size=args.batch_size)
+    if cells == 0:
+        print('No new spending since last run')
+    else:
+        print(f"Recomputed {cells} user-months, wrote {written} rollup cells")
+    print('Done')
+
+
+if __name__ == '__main__':
+    main()
@@ -22,13 +22,27 @@ import glob
 import subprocess
 import sys
 import json
-import openai
 import csv
+import re
+import time
+from datetime import datetime, timezone
 from dotenv import load_dotenv
 
 INPUT_DIR = "./raw/"
 OUTPUT_DIR = "./processed/"
 PROMPT_DIR = "./prompt/"
+LLM_MODEL = "gpt-5.1-2025-11-13"
+
+INFO_HEADER = ["card_id", "card_name", "card_type", "bank_id", "img_url", "annual_fee"]
+REWARD_HEADER = ["card_id", "category", "cashback_pct", "point_mul"]
+REWARD_CATEGORIES = {"dining", "grocery", "gas", "travel", "online", "pharma", "all"}
+CARD_TYPES = {"cashback", "point"}
+
+# Streaming validation: abort and retry once this share of rows is invalid,
+# but only after enough rows to judge
+MAX_ERROR_RATE = 0.2
+MIN_ROWS_BEFORE_ABORT = 10
+MAX_ATTEMPTS = 3
 
 def load_prompt(prompt_file: str = "prompt.txt") -> str:
     """
@@ -43,23 +57,146 @@ def load_prompt(prompt_file: str = "prompt.txt") -> str:
     return prompt
 
 
-def transform_with_llm(content: str, prompt: str) -> str:
+class StreamAborted(Exception):
+    """Raised when a streamed completion has too many invalid rows, or no valid ones."""
+
+
+def _parse_number(value: str, field: str):
+    """Parse a numeric CSV field; NULL/empty mean 0, as the prompts ask for."""
+    v = value.strip()
+    if v == "" or v.upper() == "NULL":
+        return 0
+    try:
+        n = float(v)
+    except ValueError:
+        raise ValueError(f"{field} is not numeric: {value!r}")
+    if n < 0:
+        raise ValueError(f"{field} is negative: {value!r}")
+    return int(n) if n.is_integer() else n
+
+
+def validate_info_row(fields: list, seen: set) -> list:
+    """Check one info row against INFO_HEADER and return it normalized."""
+    if len(fields) != len(INFO_HEADER):
+        raise ValueError(f"expected {len(INFO_HEADER)} fields, got {len(fields)}")
+    card_id, card_name, card_type, bank_id, img_url, annual_fee = (f.strip() for f in fields)
+    if not card_id or not card_name or not bank_id:
+        raise ValueError("card_id, card_name and bank_id are required")
+    if card_type not in CARD_TYPES:
+        raise ValueError(f"unknown card_type {card_type!r}")
+    if card_id in seen:
+        raise ValueError(f"duplicate card_id {card_id!r}")
+    seen.add(card_id)
+    return [card_id, card_name, card_type, bank_id, img_url, _parse_number(annual_fee, "annual_fee")]
+
+
+def validate_reward_row(fields: list, seen: set, known_card_ids: set = None) -> list:
+    """Check one reward row against REWARD_HEADER and return it normalized."""
+    if len(fields) != len(REWARD_HEADER):
+        raise ValueError(f"expected {len(REWARD_HEADER)} fields, got {len(fields)}")
+    card_id, category, cashback_pct, point_mul = (f.strip() for f in fields)
+    if known_card_ids is not None and card_id not in known_card_ids:
+        raise ValueError(f"unknown card_id {card_id!r}")
+    if category not in REWARD_CATEGORIES:
+        raise ValueError(f"unknown category {category!r}")
+    if (card_id, category) in seen:
+        raise ValueError(f"duplicate reward {card_id}/{category}")
+    seen.add((card_id, category))
+    return [card_id, category, _parse_number(cashback_pct, "cashback_pct"), _parse_number(point_mul, "point_mul")]
+
+
+def _is_noise(line: str, header: list) -> bool:
+    """Blank lines, comments and repeated headers are dropped without counting as errors."""
+    stripped = line.strip()
+    if not stripped or stripped.startswith(("//", "#", "```")):
+        return True
+    return [f.strip() for f in next(csv.reader([stripped]))] == header
+
+
+def stream_csv_rows(content: str, prompt: str, header: list, validate, output_path: str) -> int:
     """
-    Call the LLM API with the given prompt + content and return the transformed CSV text.
+    Stream a completion and write each valid CSV row to `output_path` as it arrives.
+
+    `validate(fields, seen)` returns the normalized row or raises ValueError.
+    If the share of invalid rows crosses MAX_ERROR_RATE the stream is closed
+    and the call retried, up to MAX_ATTEMPTS. The same limit applies to the
+    finished reply however short it is, and a reply with no valid rows fails.
+    Rows are written to a temp file that only replaces `output_path` once an
+    attempt passes.
+
+    Returns the number of rows written.
     """
+    import openai
+
     messages = [
         {"role": "system", "content": f"{prompt}"},
         {"role": "user", "content": f"{content}"}
     ]
-    response = openai.chat.completions.create(
-        model="gpt-5.1-2025-11-13",
-        messages=messages,
-        # This model does not support temperature=0; use default/1 instead
-        temperature=1
-    )
-
-    return response.choices[0].message.content.strip()
-    
+    tmp_path = output_path + ".partial"
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        started = time.perf_counter()
+        stream = openai.chat.completions.create(
+            model=LLM_MODEL,
+            messages=messages,
+            # This model does not support temperature=0; use default/1 instead
+            temperature=1,
+            stream=True,
+        )
+        seen = set()
+        valid = invalid = 0
+
+        def handle(line):
+            nonlocal valid, invalid
+            if _is_noise(line, header):
+                return
+            try:
+                row = validate(next(csv.reader([line.strip()])), seen)
+            except (ValueError, StopIteration, csv.Error) as e:
+                invalid += 1
+                print(f"  Rejected row ({e}): {line.strip()[:120]}")
+            else:
+                if valid == 0:
+                    print(f"  First row after {time.perf_counter() - started:.1f}s")
+                writer.writerow(row)
+                out_f.flush()
+                valid += 1
+            total = valid + invalid
+            if total >= MIN_ROWS_BEFORE_ABORT and invalid / total > MAX_ERROR_RATE:
+                raise StreamAborted(f"{invalid}/{total} rows invalid")
+
+        try:
+            with open(tmp_path, "w", encoding="utf-8", newline="") as out_f:
+                writer = csv.writer(out_f, lineterminator="\n")
+                writer.writerow(header)
+                buffer = ""
+                for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    buffer += chunk.choices[0].delta.content or ""
+                    *lines, buffer = buffer.split("\n")
+                    for line in lines:
+                        handle(line)
+                handle(buffer)
+                total = valid + invalid
+                if valid == 0:
+                    raise StreamAborted("no valid rows")
+                if invalid / total > MAX_ERROR_RATE:
+                    raise StreamAborted(f"{invalid}/{total} rows invalid")
+        except StreamAborted as e:
+            stream.close()
+            print(f"  Attempt {attempt}/{MAX_ATTEMPTS} aborted: {e}")
+            continue
+
+        os.replace(tmp_path, output_path)
+        if invalid:
+            print(f"  Dropped {invalid} invalid rows")
+        return valid
+
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    raise RuntimeError(f"LLM output for {output_path} failed validation after {MAX_ATTEMPTS} attempts")
+
+
 def run_all_py_files(folder_path):
     py_files = sorted(glob.glob(os.path.join(folder_path, "*.py")))
     for py_file in py_files:
@@ -70,27 +207,153 @@ def run_all_py_files(folder_path):
         if result.stderr:
             print(f"Error in {py_file}:\n{result.stderr}")
 
-def combine_json_files(input_dir: str) -> list:
-    combined = []
-    json_files = sorted(glob.glob(os.path.join(input_dir, "*.json")))
-    if not json_files:
-        print(f"No JSON files found in {input_dir}.")
-        return combined
+def iter_json_records(file_path: str, chunk_size: int = 65536):
+    """
+    Yield the records of a raw JSON file without loading it whole.
 
-    for file_path in json_files:
-        try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            # If each file contains a list of objects, extend the combined list.
-            if isinstance(data, list):
-                combined.extend(data)
+    A top-level array is parsed element by element from fixed-size chunks;
+    any other top-level value is yielded as a single record.
+    """
+    decoder = json.JSONDecoder()
+    with open(file_path, "r", encoding="utf-8") as f:
+        buffer, eof = "", False
+        # the first non-whitespace character decides whether there is an array to stream
+        while not eof and not buffer.strip():
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer += chunk
+        buffer = buffer.lstrip()
+        if not buffer.startswith("["):
+            # not an array: nothing to stream, decode the single value
+            yield json.loads(buffer + f.read())
+            return
+        pos = 1
+        while True:
+            # skip separators between elements
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buffer) and buffer[pos] == "]":
+                return
+            try:
+                record, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
             else:
-                combined.append(data)
+                # a value cut off at the chunk boundary can still decode ("350"
+                # of "350.5"), so only trust it once the delimiter after it is in
+                after = end
+                while after < len(buffer) and buffer[after] in " \t\r\n":
+                    after += 1
+                if after < len(buffer) and buffer[after] in ",]":
+                    yield record
+                    pos = after
+                    if pos > chunk_size:
+                        buffer = buffer[pos:]
+                        pos = 0
+                    continue
+                if eof:
+                    raise json.JSONDecodeError("Expecting ',' delimiter", buffer, after)
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+
+_TIMESTAMP_RE = re.compile(r"_(\d{8})(?:T(\d{6}))?\.json$")
+
+
+def describe_raw_file(file_path: str) -> dict:
+    """
+    Shard metadata for a raw file: bank (filename prefix, e.g. `boa` for
+    `boa_cards.json`), source file name and scrape timestamp. The timestamp
+    comes from a `_YYYYMMDD[THHMMSS].json` suffix when present (historical
+    snapshots, e.g. `boa_cards_20250301T120000.json`), otherwise from the
+    file's modification time.
+    """
+    name = os.path.basename(file_path)
+    match = _TIMESTAMP_RE.search(name)
+    scraped_at = None
+    if match:
+        try:
+            scraped_at = datetime.strptime(match.group(1) + (match.group(2) or "000000"), "%Y%m%d%H%M%S")
+            scraped_at = scraped_at.replace(tzinfo=timezone.utc)
+        except ValueError:
+            # eight digits that aren't a date (e.g. boa_cards_20251399.json)
+            pass
+    if scraped_at is None:
+        scraped_at = datetime.fromtimestamp(os.path.getmtime(file_path), tz=timezone.utc)
+    return {
+        "bank": name.split("_", 1)[0].split(".", 1)[0],
+        "source": name,
+        "scraped_at": scraped_at.isoformat(),
+    }
+
+
+def iter_raw_shards(input_dir: str, latest_only: bool = False):
+    """
+    Yield (shard, records) per raw JSON file, where `shard` is the metadata
+    from describe_raw_file and `records` lazily yields that file's records.
+
+    With latest_only, only the newest snapshot per bank is yielded.
+    """
+    shards = [(describe_raw_file(p), p) for p in sorted(glob.glob(os.path.join(input_dir, "*.json")))]
+    if latest_only:
+        latest = {}
+        for shard, path in shards:
+            if shard["bank"] not in latest or shard["scraped_at"] > latest[shard["bank"]][0]["scraped_at"]:
+                latest[shard["bank"]] = (shard, path)
+        shards = sorted(latest.values(), key=lambda item: item[0]["bank"])
+    for shard, path in shards:
+        yield shard, iter_json_records(path)
+
+
+def iter_raw_records(input_dir: str, latest_only: bool = False):
+    """
+    Yield every raw record with its shard metadata attached, as
+    {"bank", "source", "scraped_at", "record"} dicts. Memory stays flat no
+    matter how many raw files there are.
+    """
+    for shard, records in iter_raw_shards(input_dir, latest_only):
+        try:
+            for record in records:
+                yield {**shard, "record": record}
         except json.JSONDecodeError as e:
-            print(f"Error decoding {file_path}: {e}")
+            print(f"Error decoding {shard['source']}: {e}")
+
+
+def combine_json_files(input_dir: str) -> list:
+    combined = [item["record"] for item in iter_raw_records(input_dir)]
+    if not combined:
+        print(f"No JSON files found in {input_dir}.")
     return combined
 
+
+def merge_shard_outputs(shard_paths: list, output_path: str, key_fields: list) -> int:
+    """Concatenate per-shard CSVs into `output_path`, keeping the first row per key."""
+    seen = set()
+    written = 0
+    with open(output_path, "w", newline="", encoding="utf-8") as out_f:
+        writer = None
+        for path in shard_paths:
+            with open(path, newline="", encoding="utf-8") as in_f:
+                reader = csv.DictReader(in_f)
+                if writer is None:
+                    writer = csv.DictWriter(out_f, fieldnames=reader.fieldnames, lineterminator="\n")
+                    writer.writeheader()
+                for row in reader:
+                    key = tuple(row[k] for k in key_fields)
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    writer.writerow(row)
+                    written += 1
+    return written
+
+
 def main():
+    # imported here so scrape-only runs don't pay for the openai import
+    import openai
+
     load_dotenv()
     # Load API key
     openai.api_key = os.getenv("OPENAI_API_KEY")
@@ -104,30 +367,44 @@ def main():
     reward_prompt = load_prompt(PROMPT_DIR + "reward_prompt.txt")
     info_prompt = load_prompt(PROMPT_DIR + "info_prompt.txt")
 
-    # Find all CSV files in the input directory
-    combined_json = combine_json_files(INPUT_DIR)
-    if not combined_json:
-        print(f"No valid JSON files found in {INPUT_DIR}.")
-        return
+    # One shard per bank (newest snapshot), transformed on its own so prompt
+    # size tracks a single bank rather than every raw file
+    shard_dir = os.path.join(OUTPUT_DIR, "shards")
+    os.makedirs(shard_dir, exist_ok=True)
+    info_shards, reward_shards = [], []
+    for shard, records in iter_raw_shards(INPUT_DIR, latest_only=True):
+        try:
+            shard_json = json.dumps(list(records), ensure_ascii=False)
+        except json.JSONDecodeError as e:
+            print(f"Error decoding {shard['source']}: {e}")
+            continue
+        stem = os.path.join(shard_dir, os.path.splitext(shard["source"])[0])
+        print(f"Processing shard {shard['source']} (bank={shard['bank']}, scraped {shard['scraped_at']})")
 
-    print(f"Processing {len(combined_json)} records from JSON files...")
+        # info first: its card_ids are what reward rows are validated against
+        print(f"Doing info prompt")
+        written = stream_csv_rows(shard_json, info_prompt, INFO_HEADER,
+                                  validate_info_row, stem + ".info.csv")
+        with open(stem + ".info.csv", newline="", encoding="utf-8") as f:
+            info_ids = {row["card_id"] for row in csv.DictReader(f)}
+        print(f"{written} info rows")
 
-    print(f"Doing reward prompt")
-    reward_header = "card_id,category,cashback_pct,point_mul"
-    with open(reward_output_path, "w", encoding="utf-8") as out_f:
-        out_f.write(reward_header + "\n")
-        transformed = transform_with_llm(combined_json, reward_prompt)
-        out_f.write(transformed + "\n")
-    print(f"Combined output written to {reward_output_path}")
+        print(f"Doing reward prompt")
+        written = stream_csv_rows(shard_json, reward_prompt, REWARD_HEADER,
+                                  lambda fields, seen: validate_reward_row(fields, seen, info_ids),
+                                  stem + ".reward.csv")
+        print(f"{written} reward rows")
+        info_shards.append(stem + ".info.csv")
+        reward_shards.append(stem + ".reward.csv")
 
-    print(f"Doing info prompt")
-    info_header = "card_id,card_name,card_type,bank_id,img_url,annual_fee"
-    with open(info_output_path, "w", encoding="utf-8") as out_f:
-        out_f.write(info_header + "\n")
-        transformed = transform_with_llm(combined_json, info_prompt)
-        out_f.write(transformed + "\n", )
+    if not info_shards:
+        print(f"No valid JSON files found in {INPUT_DIR}.")
+        return
 
-    print(f"Combined output written to {info_output_path}")
+    written = merge_shard_outputs(info_shards, info_output_path, ["card_id"])
+    print(f"{written} rows written to {info_output_path}")
+    written = merge_shard_outputs(reward_shards, reward_output_path, ["card_id", "category"])
+    print(f"{written} rows written to {reward_output_path}")
 
 if __name__ == "__main__":
     #run_all_py_files("scrape/") # Uncomment to run all scrape scripts
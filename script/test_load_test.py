@@ -0,0 +1,21 @@
+import pytest
+
+from load_test import percentile
+
+
+@pytest.mark.parametrize("n, pct, expected", [
+    (10, 50, 5),
+    (100, 50, 50),
+    (100, 95, 95),
+    (100, 99, 99),
+    (100, 100, 100),
+    (3, 50, 2),
+    (1, 99, 1),
+    (20, 0, 1),
+])
+def test_percentile_nearest_rank(n, pct, expected):
+    assert percentile(list(range(1, n + 1)), pct) == expected
+
+
+def test_percentile_empty():
+    assert percentile([], 50) is None
@@ -0,0 +1,139 @@
+import json
+import sys
+import types
+from datetime import datetime, timezone
+
+import pytest
+
+import start
+from start import describe_raw_file, iter_json_records
+
+RECORDS = [{"card": "a", "tags": ["x y", "]"]}, 1, 22, 350.5, -1e3, "s", None, True, False, [], {}]
+
+
+@pytest.mark.parametrize("chunk_size", range(1, 200))
+def test_iter_json_records_across_chunk_boundaries(tmp_path, chunk_size):
+    path = tmp_path / "boa_cards.json"
+    path.write_text("  \n" * 40 + json.dumps(RECORDS, indent=1), encoding="utf-8")
+    assert list(iter_json_records(str(path), chunk_size)) == RECORDS
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 65536])
+def test_iter_json_records_single_value(tmp_path, chunk_size):
+    path = tmp_path / "boa_cards.json"
+    path.write_text("\n\n" + json.dumps({"cards": RECORDS}), encoding="utf-8")
+    assert list(iter_json_records(str(path), chunk_size)) == [{"cards": RECORDS}]
+
+
+@pytest.mark.parametrize("text", ["[1, 2", "[1 2]", "[{\"a\": 1}"])
+def test_iter_json_records_truncated(tmp_path, text):
+    path = tmp_path / "boa_cards.json"
+    path.write_text(text, encoding="utf-8")
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_json_records(str(path), 2))
+
+
+@pytest.mark.parametrize("name, expected", [
+    ("boa_cards_20250301T120000.json", "2025-03-01T12:00:00+00:00"),
+    ("boa_cards_20250301.json", "2025-03-01T00:00:00+00:00"),
+    ("boa_cards_20251399.json", None),
+    ("boa_cards_1700000000.json", None),
+    ("boa_cards.json", None),
+])
+def test_describe_raw_file_timestamp(tmp_path, name, expected):
+    path = tmp_path / name
+    path.write_text("[]", encoding="utf-8")
+    shard = describe_raw_file(str(path))
+    assert shard["bank"] == "boa"
+    # names without a valid date suffix fall back to the file's mtime
+    mtime = datetime.fromtimestamp(path.stat().st_mtime, tz=timezone.utc).isoformat()
+    assert shard["scraped_at"] == (expected or mtime)
+
+
+
+def _info_row(i):
+    return f"c{i},Card {i},cashback,bank,N/A,0"
+
+
+class FakeStream:
+    """A canned completion streamed one line per chunk."""
+
+    def __init__(self, text):
+        self.lines = text.splitlines(keepends=True)
+        self.consumed = 0
+        self.closed = False
+
+    def __iter__(self):
+        for line in self.lines:
+            self.consumed += 1
+            yield types.SimpleNamespace(choices=[types.SimpleNamespace(delta=types.SimpleNamespace(content=line))])
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def fake_openai(monkeypatch):
+    """An `openai` module whose streaming completions replay `fake_openai.replies` in order."""
+    fake = types.ModuleType("openai")
+    fake.replies, fake.streams = [], []
+
+    def create(**kwargs):
+        assert kwargs["stream"] is True
+        fake.streams.append(FakeStream(fake.replies.pop(0)))
+        return fake.streams[-1]
+
+    fake.chat = types.SimpleNamespace(completions=types.SimpleNamespace(create=create))
+    monkeypatch.setitem(sys.modules, "openai", fake)
+    return fake
+
+
+def _stream(output_path):
+    return start.stream_csv_rows("raw", "prompt", start.INFO_HEADER, start.validate_info_row, str(output_path))
+
+
+GOOD_REPLY = "\n".join([",".join(start.INFO_HEADER)] + [_info_row(i) for i in range(3)]) + "\n"
+
+
+def test_stream_aborts_mid_stream_once_error_rate_is_crossed(tmp_path, fake_openai):
+    # just too few good rows: the rate is over MAX_ERROR_RATE at row MIN_ROWS_BEFORE_ABORT
+    good = int(start.MIN_ROWS_BEFORE_ABORT * (1 - start.MAX_ERROR_RATE)) - 1
+    lines = [_info_row(i) for i in range(good)] + ["bad"] * 20
+    fake_openai.replies += ["\n".join(lines) + "\n", GOOD_REPLY]
+    out = tmp_path / "info_output.csv"
+
+    assert _stream(out) == 3
+    first = fake_openai.streams[0]
+    assert first.closed
+    assert first.consumed == start.MIN_ROWS_BEFORE_ABORT < len(lines)
+    assert out.read_text(encoding="utf-8") == GOOD_REPLY
+    assert not (tmp_path / "info_output.csv.partial").exists()
+
+
+def test_stream_retries_short_reply_over_error_rate(tmp_path, fake_openai):
+    fake_openai.replies += [_info_row(0) + "\nbad\n", GOOD_REPLY]
+    out = tmp_path / "info_output.csv"
+
+    assert _stream(out) == 3
+    assert len(fake_openai.streams) == 2
+    assert out.read_text(encoding="utf-8") == GOOD_REPLY
+
+
+def test_stream_retries_reply_without_valid_rows(tmp_path, fake_openai):
+    fake_openai.replies += ["```csv\n" + ",".join(start.INFO_HEADER) + "\n```\n", GOOD_REPLY]
+    out = tmp_path / "info_output.csv"
+
+    assert _stream(out) == 3
+    assert len(fake_openai.streams) == 2
+
+
+def test_stream_gives_up_and_keeps_previous_output(tmp_path, fake_openai):
+    fake_openai.replies += ["bad\n", _info_row(0) + "\nbad\n", ""]
+    out = tmp_path / "info_output.csv"
+    out.write_text("previous run\n", encoding="utf-8")
+
+    with pytest.raises(RuntimeError):
+        _stream(out)
+    assert len(fake_openai.streams) == start.MAX_ATTEMPTS
+    assert out.read_text(encoding="utf-8") == "previous run\n"
+    assert not (tmp_path / "info_output.csv.partial").exists()
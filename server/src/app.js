@@ -1,4 +1,5 @@
 // server/src/app.js
+const path = require('path');
 const express = require('express');
 const cors = require('cors');
 
@@ -26,6 +27,16 @@ app.use(
 // Built-in middleware for parsing JSON bodies
 app.use(express.json());
 
+// Card art thumbnails cached by script/card_art_assets.py. File names are
+// content hashes, so they never change and can be cached indefinitely. Only
+// thumbs/ is served: cache.json changes and originals/ are full-size.
+if (process.env.CARD_ART_DIR) {
+  app.use(
+    '/card-art/thumbs',
+    express.static(path.resolve(process.env.CARD_ART_DIR, 'thumbs'), { immutable: true, maxAge: '1y' })
+  );
+}
+
 // Mount routes under /api
 app.use('/api', healthRoutes);
 app.use('/api/users', usersRouter);